@@ -0,0 +1,130 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+from abc import ABC, abstractmethod
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+
+class AttachmentStore(ABC):
+    """Content-addressed blob storage for submitted images.
+
+    Keys are the SHA-256 of the content plus a file suffix, so identical
+    uploads share one object. ``read`` raises OSError for a missing or
+    unreachable object.
+    """
+
+    @abstractmethod
+    def put(self, data, suffix=""):
+        """Store ``data`` and return its key."""
+
+    @abstractmethod
+    def read(self, key):
+        """Return the bytes stored under ``key``."""
+
+    @abstractmethod
+    def exists(self, key):
+        """Whether ``key`` is already stored."""
+
+
+class LocalAttachmentStore(AttachmentStore):
+    """Files in a local directory; for development and tests, since a
+    worker dyno's disk is wiped on every restart."""
+
+    def __init__(self, root="attachments"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        # Keys are hex digests, but never let one escape the store directory.
+        return os.path.join(self.root, os.path.basename(key))
+
+    def put(self, data, suffix=""):
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for start in range(0, len(data), CHUNK_SIZE):
+                    chunk = data[start : start + CHUNK_SIZE]
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            key = digest.hexdigest() + suffix
+            if os.path.exists(self._path(key)):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, self._path(key))
+            return key
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def read(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+
+class S3AttachmentStore(AttachmentStore):
+    """Objects in an S3-compatible bucket, which outlive the worker.
+
+    ``endpoint_url`` points at non-AWS providers such as R2 or MinIO;
+    credentials come from the usual ``AWS_*`` environment variables.
+    """
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, client=None):
+        if client is None:
+            # Only deployments that store images in a bucket need boto3.
+            import boto3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _object_key(self, key):
+        return self.prefix + os.path.basename(key)
+
+    def put(self, data, suffix=""):
+        key = hashlib.sha256(data).hexdigest() + suffix
+        if not self.exists(key):
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._object_key(key),
+                Body=data,
+                ContentType=mimetypes.guess_type(key)[0] or "application/octet-stream",
+            )
+        return key
+
+    def read(self, key):
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self._object_key(key)
+            )
+            return response["Body"].read()
+        except (BotoCoreError, ClientError) as e:
+            raise OSError(f"Could not read {key} from {self.bucket}: {e}") from e
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+
+def image_suffix(filename):
+    suffix = os.path.splitext(filename or "")[1].lower()
+    return suffix if suffix in IMAGE_SUFFIXES else ".png"
@@ -0,0 +1,96 @@
+from collections import Counter
+from datetime import datetime
+
+STATUSES = ("Pending", "Confirmed", "Rejected")
+
+
+def refresh_board(cursor):
+    # CONCURRENTLY keeps /board readable while the rollup is rebuilt.
+    cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY drop_board;")
+
+
+def _fetch_progress(cursor):
+    cursor.execute(
+        "SELECT guild_id, team_role, category, progress FROM team_progress;"
+    )
+    return cursor.fetchall()
+
+
+def fetch_board(cursor):
+    cursor.execute(
+        "SELECT guild_id, team_role, category, status, count FROM drop_board;"
+    )
+    return cursor.fetchall(), _fetch_progress(cursor)
+
+
+def load_board(cursor):
+    refresh_board(cursor)
+    return fetch_board(cursor)
+
+
+def load_drop_counts(cursor):
+    """Counts straight from ``drops``, so edits made outside the bot show up.
+
+    The rollup only knows what was recorded in ``drop_events``; ``drops``
+    is still the source of truth for each drop's status.
+    """
+    cursor.execute(
+        """
+        SELECT guild_id, team_role, category, status, COUNT(*) AS count
+        FROM drops
+        WHERE category IS NOT NULL
+        GROUP BY guild_id, team_role, category, status;
+        """
+    )
+    return cursor.fetchall(), _fetch_progress(cursor)
+
+
+class BoardCache:
+    """Drop counts and progress keyed by ``(guild_id, team_role, category)``."""
+
+    def __init__(self):
+        self.counts = {}
+        self.progress = {}
+        self.loaded_at = None
+
+    def replace(self, status_rows, progress_rows):
+        counts = {}
+        for row in status_rows:
+            key = (row["guild_id"], row["team_role"], row["category"])
+            counts.setdefault(key, Counter())[row["status"]] = row["count"]
+        self.counts = counts
+        self.progress = {
+            (row["guild_id"], row["team_role"], row["category"]): row["progress"]
+            for row in progress_rows
+        }
+        self.loaded_at = datetime.utcnow()
+
+    def clear(self, guild_id):
+        for cells in (self.counts, self.progress):
+            for key in [key for key in cells if key[0] == guild_id]:
+                del cells[key]
+
+    def add_drop(self, guild_id, team_role, category, status="Pending"):
+        self.counts.setdefault((guild_id, team_role, category), Counter())[status] += 1
+
+    def move_drop(self, guild_id, team_role, category, old_status, new_status):
+        if old_status == new_status:
+            return
+        counts = self.counts.setdefault((guild_id, team_role, category), Counter())
+        if counts[old_status] > 0:
+            counts[old_status] -= 1
+        counts[new_status] += 1
+
+    def set_progress(self, guild_id, team_role, category, progress):
+        self.progress[(guild_id, team_role, category)] = progress
+
+    def total(self, guild_id, status):
+        return sum(
+            counts[status]
+            for key, counts in self.counts.items()
+            if key[0] == guild_id
+        )
+
+    def cell(self, guild_id, team_role, category):
+        counts = self.counts.get((guild_id, team_role, category), Counter())
+        return +counts, self.progress.get((guild_id, team_role, category))
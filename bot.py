@@ -1,12 +1,49 @@
+import time
+
+# Taken first so the startup log can show how long imports took.
+STARTED_AT = time.perf_counter()
+
 import os
 import discord
 from dotenv import load_dotenv
 from discord import app_commands
-from datetime import datetime
-import psycopg2
-from psycopg2.extras import DictCursor
+from discord.ext import tasks
+from datetime import datetime, timedelta
+import asyncio
+import logging
 import random
+
+import hashlib
+import io
 import json
+import math
+
+import aiohttp
+
+import data
+import db
+import executor
+import metrics
+import migrations
+from attachments import LocalAttachmentStore, S3AttachmentStore, image_suffix
+from board import STATUSES, BoardCache, load_board, load_drop_counts, refresh_board
+from cache import LRUCache, UserResolver
+from events import EventWriter
+from export import FORMATS, export_drops
+from guild_config import GuildConfig, GuildConfigs, claim_legacy_rows, save_config
+from guild_index import GuildIndexes
+from image_hashing import (
+    BKTree,
+    ImageTooLarge,
+    PublicResolver,
+    dhash,
+    download,
+    to_signed,
+    to_unsigned,
+)
+from monitoring import LoopLagMonitor, StepTimer
+from outbound import MAX_UPLOAD_BYTES, Dispatcher
+from wom import WiseOldManClient
 
 thumbnail_url = "https://i.imgur.com/RC3d1lr.png"
 
@@ -58,70 +95,569 @@ CATEGORIES = [
     "Perilous Moons Unique",
 ]
 
+# Owner of the original single-guild event, kept for LEGACY_GUILD_ID.
+LEGACY_OWNER_ID = 252465642802774017
+
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_HEALTH_CHECK_INTERVAL", "30"))
+BOARD_RECONCILE_MINUTES = float(os.getenv("BOARD_RECONCILE_MINUTES", "5"))
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "10"))
+LOOP_LAG_WARN_MS = float(os.getenv("LOOP_LAG_WARN_MS", "250"))
+DUPLICATE_HASH_DISTANCE = int(os.getenv("DUPLICATE_HASH_DISTANCE", "6"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+ATTACHMENT_DIR = os.getenv("ATTACHMENT_DIR", "attachments")
+ATTACHMENT_BUCKET = os.getenv("ATTACHMENT_BUCKET")
+ATTACHMENT_PREFIX = os.getenv("ATTACHMENT_PREFIX", "")
+ATTACHMENT_ENDPOINT_URL = os.getenv("ATTACHMENT_ENDPOINT_URL")
+LEGACY_GUILD_ID = int(os.getenv("LEGACY_GUILD_ID", "0"))
+SYNC_GUILD_ID = int(os.getenv("SYNC_GUILD_ID", "0"))
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "").lower() in ("1", "true")
+OUTBOUND_COALESCE_SECONDS = float(os.getenv("OUTBOUND_COALESCE_SECONDS", "1.5"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+WOM_POLL_MINUTES = float(os.getenv("WOM_POLL_MINUTES", "30"))
+WOM_START_DATE = os.getenv("WOM_START_DATE", data.start_date)
+WOM_END_DATE = os.getenv("WOM_END_DATE", data.end_date)
+
+executor.configure(BLOCKING_WORKERS)
+
+# Guilds that haven't run /configure get the event defined above.
+guild_configs = GuildConfigs(GuildConfig(None, TEAM_NAMES, TEAM_CAPTAINS, CATEGORIES))
+board_cache = BoardCache()
+image_indexes = {}
+
+
+def image_index(guild_id):
+    return image_indexes.setdefault(guild_id, BKTree())
+
+
+def load_state(cursor):
+    if LEGACY_GUILD_ID:
+        claim_legacy_rows(
+            cursor,
+            guild_configs.default.replace(
+                guild_id=LEGACY_GUILD_ID, owner_id=LEGACY_OWNER_ID
+            ),
+        )
+    guild_configs.load(cursor)
+    board_cache.replace(*load_board(cursor))
+    cursor.execute(
+        """
+        SELECT drop_id, guild_id, team_role, image_hash
+        FROM drops
+        WHERE image_hash IS NOT NULL;
+        """
+    )
+    for row in cursor.fetchall():
+        image_index(row["guild_id"]).add(
+            to_unsigned(row["image_hash"]), (row["drop_id"], row["team_role"])
+        )
 
-
-def get_db_connection():
-    conn = psycopg2.connect(DATABASE_URL, sslmode="require")
-    cursor = conn.cursor(cursor_factory=DictCursor)
-    return conn, cursor
+review_messages = LRUCache(maxsize=512)
+drop_events = EventWriter()
+# A worker dyno's disk is wiped on restart, so production needs a bucket.
+if ATTACHMENT_BUCKET:
+    attachment_store = S3AttachmentStore(
+        ATTACHMENT_BUCKET, ATTACHMENT_PREFIX, ATTACHMENT_ENDPOINT_URL
+    )
+else:
+    attachment_store = LocalAttachmentStore(ATTACHMENT_DIR)
+
+wom_client = WiseOldManClient(api_key=os.getenv("WOM_API_KEY"))
+wom_snapshot = {"summary": None, "leaders": None, "updated_at": None}
+
+SET_STATUS_QUERY = """
+    UPDATE drops
+    SET status = %s
+    FROM (
+        SELECT drop_id, status FROM drops
+        WHERE drop_id = %s AND guild_id = %s
+        FOR UPDATE
+    ) AS previous
+    WHERE drops.drop_id = previous.drop_id
+    RETURNING drops.*, previous.status AS previous_status;
+"""
+
+SET_STATUS_MANY_QUERY = """
+    UPDATE drops
+    SET status = %s
+    FROM (
+        SELECT drop_id, status FROM drops
+        WHERE drop_id = ANY(%s) AND guild_id = %s
+        FOR UPDATE
+    ) AS previous
+    WHERE drops.drop_id = previous.drop_id
+    RETURNING drops.*, previous.status AS previous_status;
+"""
+MAX_BATCH_REVIEW = 100
+# drops.drop_id is a SERIAL, i.e. a 32-bit integer.
+MAX_DROP_ID = 2**31 - 1
+
+
+def valid_drop_id(text):
+    return text.isascii() and text.isdigit() and 0 < int(text) <= MAX_DROP_ID
+
+REVIEW_PENDING_QUERY = """
+    UPDATE drops
+    SET status = %s
+    FROM (
+        SELECT drop_id, status FROM drops
+        WHERE drop_id = %s AND guild_id = %s AND status = 'Pending'
+        FOR UPDATE
+    ) AS previous
+    WHERE drops.drop_id = previous.drop_id
+    RETURNING drops.*, previous.status AS previous_status;
+"""
+
+NEXT_PENDING_QUERY = """
+    SELECT * FROM drops
+    WHERE guild_id = %s AND status = 'Pending' AND (timestamp, drop_id) > (%s, %s)
+    ORDER BY timestamp, drop_id
+    LIMIT 1;
+"""
+
+
+async def find_review_message(staff_channel, drop_data):
+    drop_id = drop_data["drop_id"]
+    # The row is authoritative; the cache only covers sends whose ID hasn't
+    # reached the database yet.
+    message_id = drop_data["staff_message_id"] or review_messages.get(drop_id)
+
+    if message_id is None:
+        # Drops submitted before message IDs were recorded.
+        async for message in staff_channel.history(limit=100):
+            if (
+                message.embeds
+                and f"**Drop ID:** `DROP-{drop_id}`" in message.embeds[0].description
+            ):
+                message_id = message.id
+                break
+
+    if message_id is None:
+        return None
+
+    review_messages.set(drop_id, message_id)
+    return staff_channel.get_partial_message(message_id)
+
+
+image_session = None
+
+
+async def read_image(image_attachment, image_url):
+    global image_session
+    if image_attachment:
+        if image_attachment.size > IMAGE_MAX_BYTES:
+            raise ImageTooLarge(image_attachment.size)
+        return await image_attachment.read()
+
+    if image_session is None or image_session.closed:
+        # Users choose the URL, so never let it reach the bot host's network.
+        image_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(resolver=PublicResolver())
+        )
+    return await download(image_session, image_url, IMAGE_MAX_BYTES)
 
 
-conn, cursor = get_db_connection()
+async def process_submission(image_attachment, image_url):
+    """Download the image once, then hash it and keep a copy in the store.
 
-cursor.execute(
-    """
-    CREATE TABLE IF NOT EXISTS drops (
-        drop_id SERIAL PRIMARY KEY,
-        submitter_id BIGINT,
-        team_role TEXT,
-        category TEXT,
-        image_url TEXT,
-        status TEXT DEFAULT 'Pending',
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
+    Returns ``(data, image_hash, image_key)``; any part may be None since
+    neither duplicate detection nor storage should block a submission.
+    ``data`` is only returned once Pillow has decoded it as an image.
     """
-)
+    try:
+        data = await asyncio.wait_for(
+            read_image(image_attachment, image_url), IMAGE_FETCH_TIMEOUT
+        )
+    except Exception as e:
+        logging.warning("Could not download submitted image %s: %r", image_url, e)
+        return None, None, None
 
-cursor.execute(
-    """
-    DO $$
-    BEGIN
-        IF NOT EXISTS (
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_name='drops' AND column_name='category'
-        ) THEN
-            ALTER TABLE drops ADD COLUMN category TEXT;
-        END IF;
-
-        IF NOT EXISTS (
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_name='drops' AND column_name='progress'
-        ) THEN
-            ALTER TABLE drops ADD COLUMN progress TEXT DEFAULT NULL;
-        END IF;
-    END $$;
-    """
-)
+    try:
+        image_hash = await executor.run_blocking(dhash, data)
+    except Exception as e:
+        # Bytes Pillow can't decode are never stored or re-uploaded.
+        logging.warning("Could not hash submitted image %s: %r", image_url, e)
+        return None, None, None
+
+    image_key = None
+    filename = image_attachment.filename if image_attachment else image_url
+    try:
+        image_key = await executor.run_blocking(
+            attachment_store.put, data, image_suffix(filename)
+        )
+    except Exception as e:
+        logging.warning("Could not store submitted image %s: %r", image_url, e)
+    return data, image_hash, image_key
+
+
+def attach_image(embed, image_key, data):
+    """Point ``embed`` at an uploaded copy of the image and return the file."""
+    embed.set_image(url=f"attachment://{image_key}")
+    return discord.File(io.BytesIO(data), filename=image_key)
 
-conn.commit()
-cursor.close()
-conn.close()
+
+async def stored_image(drop_data):
+    image_key = drop_data.get("image_key")
+    if not image_key:
+        return None
+    try:
+        return await executor.run_blocking(attachment_store.read, image_key)
+    except OSError as e:
+        logging.warning("Stored image %s is unavailable: %r", image_key, e)
+        return None
+
+
+async def gather_sends(*coros):
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logging.warning("Channel notification failed: %r", result)
+    return [None if isinstance(result, Exception) else result for result in results]
+
+
+async def react_to_review(staff_channel, drop_data, emoji):
+    found_message = await find_review_message(staff_channel, drop_data)
+    if found_message:
+        dispatcher.react(found_message, emoji)
+
+
+async def notify_team(team_channel, drop_data, embed):
+    # The mention only needs the ID; the author line is a bonus when the
+    # submitter is already cached, so never spend a REST call on it here.
+    submitter = await users.resolve(
+        drop_data["submitter_id"], team_channel.guild, fetch=False
+    )
+    if submitter:
+        embed.set_author(
+            name=submitter.display_name, icon_url=submitter.display_avatar.url
+        )
+    kwargs = {"content": f"<@{drop_data['submitter_id']}>", "embed": embed}
+    image_data = await stored_image(drop_data)
+    if image_data:
+        kwargs["file"] = attach_image(embed, drop_data["image_key"], image_data)
+    # Reviews landing close together reach the team as one multi-embed post.
+    return dispatcher.send(team_channel, coalesce=True, **kwargs)
+
+
+async def announce_review(interaction, drop_data, embed, emoji, timer):
+    index = guild_indexes[interaction.guild]
+    staff_channel = index.channel("staff-review")
+    team_channel = index.team_channel(drop_data["team_role"])
+
+    sends = []
+    if staff_channel:
+        sends.append(react_to_review(staff_channel, drop_data, emoji))
+    if team_channel:
+        sends.append(notify_team(team_channel, drop_data, embed))
+
+    # Only queues the Discord calls; the dispatcher's workers make them.
+    with timer.step("notify"):
+        await gather_sends(*sends)
+
+
+async def record_message_ids(drop_id, staff_sent, team_sent):
+    staff_message = await staff_sent if staff_sent else None
+    team_message = await team_sent if team_sent else None
+    if staff_message:
+        review_messages.set(drop_id, staff_message.id)
+    try:
+        await db.execute(
+            """
+            UPDATE drops
+            SET staff_message_id = %s, team_message_id = %s
+            WHERE drop_id = %s;
+            """,
+            (
+                staff_message.id if staff_message else None,
+                team_message.id if team_message else None,
+                drop_id,
+            ),
+        )
+    except Exception:
+        logging.exception("Could not record message IDs for DROP-%s", drop_id)
+
+
+loop_monitor = LoopLagMonitor(warn_after=LOOP_LAG_WARN_MS / 1000)
+
+
+def finish_command(interaction, error=None):
+    tracked = loop_monitor.end(interaction)
+    if tracked is None:
+        return
+    name, started = tracked
+    if isinstance(error, app_commands.CommandInvokeError):
+        error = error.original
+    metrics.observe_command(name, time.monotonic() - started, error)
+
+
+class CommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction):
+        # Autocomplete never reaches the completion or error hooks.
+        if interaction.type != discord.InteractionType.autocomplete:
+            loop_monitor.begin(interaction)
+        return True
+
+    async def on_error(self, interaction, error):
+        finish_command(interaction, error)
+        await super().on_error(interaction, error)
+
+
+class BingoBot(discord.AutoShardedClient):
+    async def setup_hook(self):
+        # Runs once after login and before the gateway connects, so none of
+        # this holds up the import or repeats on reconnect.
+        await start_up()
 
 
 intents = discord.Intents.default()
 intents.message_content = True
-bot = discord.Client(intents=intents)
-tree = app_commands.CommandTree(bot)
+bot = BingoBot(intents=intents)
+tree = CommandTree(bot)
+users = UserResolver(bot)
+guild_indexes = GuildIndexes(guild_configs)
+dispatcher = Dispatcher(window=OUTBOUND_COALESCE_SECONDS)
+
+discord_rate_limits = metrics.RateLimitCounter()
+logging.getLogger("discord.http").addHandler(discord_rate_limits)
+
+metrics.registry.gauge(
+    "bingo_db_pool_connections",
+    "Database pool size, connections checked out and callers waiting.",
+    lambda: {(state,): value for state, value in db.pool_stats().items()},
+    ("state",),
+)
+metrics.registry.gauge(
+    "bingo_gateway_latency_seconds",
+    "Heartbeat latency per shard.",
+    lambda: {
+        (str(shard_id),): latency
+        for shard_id, latency in bot.latencies
+        if math.isfinite(latency)
+    },
+    ("shard",),
+)
+metrics.registry.gauge(
+    "bingo_event_loop_lag_seconds",
+    "Most recent event loop wake-up delay.",
+    lambda: loop_monitor.last_lag,
+)
+metrics.registry.gauge(
+    "bingo_event_loop_stalls_total",
+    "Event loop wake-ups later than LOOP_LAG_WARN_MS.",
+    lambda: loop_monitor.stalls,
+    kind="counter",
+)
+metrics.registry.gauge(
+    "bingo_rate_limits_total",
+    "429 responses, by API.",
+    lambda: {
+        ("discord",): discord_rate_limits.hits,
+        ("discord_outbound",): dispatcher.rate_limited,
+        ("wom",): wom_client.stats["rate_limited"],
+    },
+    ("api",),
+    kind="counter",
+)
+metrics.registry.gauge(
+    "bingo_user_lookups_total",
+    "Submitter lookups, by where they were answered.",
+    lambda: {(source,): count for source, count in users.stats.items()},
+    ("source",),
+    kind="counter",
+)
+metrics.registry.gauge(
+    "bingo_outbound_queued",
+    "Messages and reactions waiting in the per-channel dispatcher queues.",
+    lambda: dispatcher.pending(),
+)
+metrics.registry.gauge(
+    "bingo_outbound_coalesced_total",
+    "Notifications merged into another message instead of sent alone.",
+    lambda: dispatcher.coalesced,
+    kind="counter",
+)
+metrics.registry.gauge(
+    "bingo_drop_events_queued",
+    "Drop events waiting to be written.",
+    lambda: drop_events.pending(),
+)
+
+
+@tasks.loop(minutes=BOARD_RECONCILE_MINUTES)
+async def reconcile_board():
+    # The first iteration runs straight away, right after load_state warmed
+    # the cache from the rollup, so there is nothing to reconcile yet.
+    if reconcile_board.current_loop == 0:
+        return
+    # Count from drops so edits made outside the bot are caught too.
+    board_cache.replace(*await db.run(load_drop_counts))
+
+
+def _summarise_gains(gains):
+    gains_df = data.normalize_gains(gains, data.bosses, data.skills)
+    return data.team_summary(gains_df), data.metric_leaders(gains_df)
+
+
+@tasks.loop(minutes=WOM_POLL_MINUTES)
+async def poll_wom():
+    # Player rosters only exist in data.py, so every guild shares one WOM
+    # event; /configure doesn't change what is polled here.
+    try:
+        gains = await wom_client.gains_for_teams(
+            data.teams, WOM_START_DATE, WOM_END_DATE
+        )
+        summary, leaders = await executor.run_blocking(_summarise_gains, gains)
+    except Exception:
+        logging.exception("WiseOldMan poll failed; keeping the previous snapshot")
+        return
+
+    wom_snapshot.update(summary=summary, leaders=leaders, updated_at=datetime.utcnow())
+
+
+@poll_wom.before_loop
+async def before_poll_wom():
+    await wom_client.__aenter__()
+
+
+@poll_wom.after_loop
+async def after_poll_wom():
+    await wom_client.close()
+
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    finish_command(interaction)
+
+
+@bot.event
+async def on_guild_channel_create(channel):
+    guild_indexes.rebuild(channel.guild)
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    guild_indexes.rebuild(channel.guild)
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    if before.name != after.name:
+        guild_indexes.rebuild(after.guild)
+
+
+@bot.event
+async def on_guild_role_create(role):
+    guild_indexes.rebuild(role.guild)
+
+
+@bot.event
+async def on_guild_role_delete(role):
+    guild_indexes.rebuild(role.guild)
+
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name:
+        guild_indexes.rebuild(after.guild)
+
+
+@bot.event
+async def on_guild_join(guild):
+    guild_indexes.rebuild(guild)
+
+
+@bot.event
+async def on_guild_remove(guild):
+    guild_indexes.discard(guild)
+
+
+def command_tree_hash(guild=None):
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+async def sync_commands():
+    """Upload the command tree only if it changed since the last sync.
+
+    With ``SYNC_GUILD_ID`` the commands go to that one guild instead, which
+    Discord applies immediately rather than after a global rollout.
+    """
+    guild = discord.Object(SYNC_GUILD_ID) if SYNC_GUILD_ID else None
+    if guild:
+        tree.copy_global_to(guild=guild)
+
+    key = f"command_tree:{bot.application_id}:{SYNC_GUILD_ID or 'global'}"
+    digest = command_tree_hash(guild)
+    row = await db.fetchone("SELECT value FROM bot_state WHERE key = %s;", (key,))
+    if row and row["value"] == digest and not FORCE_COMMAND_SYNC:
+        logging.info("Command tree unchanged; skipping sync")
+        return False
+
+    await tree.sync(guild=guild)
+    await db.execute(
+        """
+        INSERT INTO bot_state (key, value) VALUES (%s, %s)
+        ON CONFLICT (key) DO UPDATE
+        SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP;
+        """,
+        (key, digest),
+    )
+    logging.info("Synced command tree (%s)", SYNC_GUILD_ID or "global")
+    return True
+
+
+gateway_ready = False
+
+
+async def start_up():
+    timer = StepTimer("startup", prefix="")
+    timer.started = STARTED_AT
+    timer.steps.append(("imports", bot_loaded_at - STARTED_AT))
+    timer.steps.append(("login", time.perf_counter() - bot_loaded_at))
+    with timer.step("db_pool"):
+        await executor.run_blocking(
+            db.init_pool,
+            DATABASE_URL,
+            minconn=DB_POOL_MIN,
+            maxconn=DB_POOL_MAX,
+            health_check_interval=DB_HEALTH_CHECK_INTERVAL,
+        )
+    with timer.step("migrations"):
+        await executor.run_blocking(migrations.migrate)
+    with timer.step("load_state"):
+        await db.run(load_state)
+    with timer.step("command_sync"):
+        await sync_commands()
+    if METRICS_PORT:
+        with timer.step("metrics"):
+            try:
+                await metrics.serve(METRICS_HOST, METRICS_PORT)
+            except OSError:
+                logging.exception("Could not start the metrics endpoint")
+    timer.log()
 
 
 @bot.event
 async def on_ready():
-    await tree.sync()
+    for guild in bot.guilds:
+        guild_indexes.rebuild(guild)
+    loop_monitor.start()
+    drop_events.start()
+    if not reconcile_board.is_running():
+        reconcile_board.start()
+    if not poll_wom.is_running():
+        poll_wom.start()
+    global gateway_ready
+    if not gateway_ready:
+        gateway_ready = True
+        elapsed = time.perf_counter() - STARTED_AT
+        logging.info("Gateway ready %.0f ms after start", elapsed * 1000)
     print(f"Logged in as {bot.user}!")
 
 
@@ -130,16 +666,14 @@ async def on_ready():
     description="Randomly pick and order team captains for the draft.",
 )
 async def randomise(interaction: discord.Interaction):
-    shuffled_captains = TEAM_CAPTAINS.copy()
+    shuffled_captains = guild_configs[interaction.guild_id].captains.copy()
     random.shuffle(shuffled_captains)
 
     draft_order = "\n".join(
         [f"{i+1}. {captain}" for i, captain in enumerate(shuffled_captains)]
     )
 
-    team_captains_role = discord.utils.get(
-        interaction.guild.roles, name="team captains"
-    )
+    team_captains_role = guild_indexes[interaction.guild].role("team captains")
 
     embed = discord.Embed(
         title="🎲 Team Captains Draft Order",
@@ -158,18 +692,38 @@ async def randomise(interaction: discord.Interaction):
 from discord import app_commands
 
 
+def match_option(value, options):
+    """Find ``value`` in ``options`` ignoring case; autocomplete is only a hint."""
+    value = value.strip().lower()
+    return next((option for option in options if option.lower() == value), None)
+
+
+async def team_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        app_commands.Choice(name=team.title(), value=team)
+        for team in guild_configs[interaction.guild_id].teams
+        if current.lower() in team
+    ][:25]
+
+
+async def category_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        app_commands.Choice(name=category, value=category)
+        for category in guild_configs[interaction.guild_id].categories
+        if current.lower() in category.lower()
+    ][:25]
+
+
 @tree.command(name="submit", description="Submit a drop for review")
 @app_commands.describe(
     category="Category of the drop",
     image_url="URL of the image (optional, use an attachment instead if available)",
     image_attachment="Attach the image directly (preferred)",
 )
-@app_commands.choices(
-    category=[app_commands.Choice(name=cat, value=cat) for cat in CATEGORIES]
-)
+@app_commands.autocomplete(category=category_autocomplete)
 async def submit(
     interaction: discord.Interaction,
-    category: app_commands.Choice[str],
+    category: str,
     image_url: str = None,
     image_attachment: discord.Attachment = None,
 ):
@@ -180,14 +734,14 @@ async def submit(
         )
         return
 
-    team_role = next(
-        (
-            role.name.lower()
-            for role in interaction.user.roles
-            if role.name.lower() in TEAM_NAMES
-        ),
-        None,
-    )
+    category = match_option(category, guild_configs[interaction.guild_id].categories)
+    if not category:
+        await interaction.response.send_message(
+            "⚠️ Please pick one of the listed categories.", ephemeral=True
+        )
+        return
+
+    team_role = guild_indexes[interaction.guild].team_for_member(interaction.user)
     if not team_role:
         await interaction.response.send_message(
             "⛔ You don't have a valid team role. Please contact a staff member.",
@@ -209,54 +763,140 @@ async def submit(
         )
         return
 
-    conn, cursor = get_db_connection()
+    timer = StepTimer("submit")
+    with timer.step("defer"):
+        await interaction.response.defer(ephemeral=True, thinking=True)
 
     try:
-        cursor.execute(
-            """
-            INSERT INTO drops (submitter_id, team_role, category, image_url)
-            VALUES (%s, %s, %s, %s)
-            RETURNING drop_id;
-            """,
-            (interaction.user.id, team_role, category.value, image_url),
+        with timer.step("image"):
+            image_data, image_hash, image_key = await process_submission(
+                image_attachment, image_url
+            )
+        duplicates = (
+            image_index(interaction.guild_id).search(
+                image_hash, DUPLICATE_HASH_DISTANCE
+            )
+            if image_hash is not None
+            else []
         )
-        drop_id = cursor.fetchone()["drop_id"]
-        conn.commit()
+
+        with timer.step("db"):
+            row = await db.fetchone(
+                """
+                INSERT INTO drops (
+                    guild_id, submitter_id, team_role, category,
+                    image_url, image_hash, image_key
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING drop_id;
+                """,
+                (
+                    interaction.guild_id,
+                    interaction.user.id,
+                    team_role,
+                    category,
+                    image_url,
+                    to_signed(image_hash) if image_hash is not None else None,
+                    image_key,
+                ),
+            )
+        drop_id = row["drop_id"]
+        # The review announcements show the submitter without a REST call, even
+        # once the member has dropped out of the gateway cache.
+        users.remember(interaction.user)
+        board_cache.add_drop(interaction.guild_id, team_role, category)
+        drop_events.record(
+            "submit",
+            interaction.guild_id,
+            drop_id=drop_id,
+            actor_id=interaction.user.id,
+            team_role=team_role,
+            category=category,
+            new_status="Pending",
+        )
+        if image_hash is not None:
+            image_index(interaction.guild_id).add(image_hash, (drop_id, team_role))
 
         embed = discord.Embed(
             title=f"New Drop Submission from {interaction.user} ({team_role.title()}):",
-            description=f"**Drop ID:** `DROP-{drop_id}`\n**Category:** {category.value}",
+            description=f"**Drop ID:** `DROP-{drop_id}`\n**Category:** {category}",
             color=discord.Color.blue(),
         )
         embed.set_image(url=image_url)
         embed.set_thumbnail(url=thumbnail_url)
 
-        staff_channel = discord.utils.get(
-            interaction.guild.text_channels, name="staff-review"
-        )
-        if staff_channel:
-            await staff_channel.send(embed=embed)
-
-        team_channel = discord.utils.get(
-            interaction.guild.text_channels, name=team_role.replace(" ", "-")
-        )
-        if team_channel:
-            await team_channel.send(
-                content=f"📥 {interaction.user.mention} has submitted a new drop for review!",
-                embed=embed,
+        index = guild_indexes[interaction.guild]
+        staff_channel = index.channel("staff-review")
+        team_channel = index.team_channel(team_role)
+
+        staff_embed = embed
+        if duplicates:
+            staff_embed = embed.copy()
+            staff_embed.add_field(
+                name="⚠️ Possible Duplicate",
+                value="\n".join(
+                    f"`DROP-{other_id}` ({other_team.title()}, distance {distance})"
+                    for distance, (other_id, other_team) in duplicates[:5]
+                ),
+                inline=False,
             )
 
-        await interaction.response.send_message(
-            f"✅ Your drop with ID `DROP-{drop_id}` has been submitted and is pending review in {staff_channel.mention}.",
-            ephemeral=True,
+        staff_kwargs = {"embed": staff_embed}
+        team_kwargs = {
+            "content": f"📥 {interaction.user.mention} has submitted a new drop for review!",
+            "embed": embed,
+        }
+        if image_key:
+            # A File can only be sent once, so each message gets its own.
+            staff_kwargs["file"] = attach_image(staff_embed, image_key, image_data)
+            team_kwargs["file"] = attach_image(embed, image_key, image_data)
+
+        # The staff message stays separate so it can be reacted to per drop.
+        staff_sent = (
+            dispatcher.send(staff_channel, **staff_kwargs) if staff_channel else None
         )
-    except Exception as e:
-        await interaction.response.send_message(
-            f"❌ An error occurred: {e}", ephemeral=True
+        team_sent = (
+            dispatcher.send(team_channel, coalesce=True, **team_kwargs)
+            if team_channel
+            else None
         )
-    finally:
-        cursor.close()
-        conn.close()
+        dispatcher.spawn(record_message_ids(drop_id, staff_sent, team_sent))
+
+        review_channel = staff_channel.mention if staff_channel else "#staff-review"
+        with timer.step("followup"):
+            await interaction.followup.send(
+                f"✅ Your drop with ID `DROP-{drop_id}` has been submitted and is pending review in {review_channel}.",
+                ephemeral=True,
+            )
+        timer.log(f"DROP-{drop_id}")
+    except Exception as e:
+        await interaction.followup.send(f"❌ An error occurred: {e}", ephemeral=True)
+
+
+def approved_embed(drop_data, reviewer, comment=None):
+    embed = discord.Embed(
+        title="✅ Drop Approved!",
+        description=f"**Drop ID:** `DROP-{drop_data['drop_id']}`\n**Category:** {drop_data['category']}\n**Approved by:** {reviewer.mention}",
+        color=discord.Color.green(),
+    )
+    embed.set_image(url=drop_data["image_url"])
+    embed.set_thumbnail(url=thumbnail_url)
+
+    if comment:
+        embed.add_field(name="Comment", value=comment, inline=False)
+    return embed
+
+
+def rejected_embed(drop_data, reviewer, reason):
+    embed = discord.Embed(
+        title="❌ Drop Rejected",
+        description=f"**Drop ID:** `DROP-{drop_data['drop_id']}`\n**Category:** {drop_data['category']}\n**Rejected by:** {reviewer.mention}",
+        color=discord.Color.red(),
+    )
+    embed.set_image(url=drop_data["image_url"])
+    embed.set_thumbnail(url=thumbnail_url)
+    embed.add_field(name="Reason", value=reason, inline=False)
+    return embed
 
 
 @tree.command(name="confirm", description="Confirm a drop submission")
@@ -265,67 +905,50 @@ async def submit(
 )
 @app_commands.checks.has_role("Staff")
 async def confirm(interaction: discord.Interaction, drop_id: str, comment: str = None):
-    conn, cursor = get_db_connection()
+    drop_id_clean = drop_id.upper().replace("DROP-", "").strip()
+    if not valid_drop_id(drop_id_clean):
+        await interaction.response.send_message(
+            f"⚠️ `{drop_id}` is not a valid drop ID.", ephemeral=True
+        )
+        return
+
+    timer = StepTimer("confirm")
+    with timer.step("defer"):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
     try:
-        drop_id_clean = drop_id.upper().replace("DROP-", "").strip()
-        cursor.execute("SELECT * FROM drops WHERE drop_id = %s;", (drop_id_clean,))
-        drop_data = cursor.fetchone()
+        with timer.step("db"):
+            drop_data = await db.fetchone(
+                SET_STATUS_QUERY,
+                ("Confirmed", int(drop_id_clean), interaction.guild_id),
+            )
 
         if not drop_data:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"⚠️ Drop ID `DROP-{drop_id_clean}` not found.", ephemeral=True
             )
             return
 
-        cursor.execute(
-            "UPDATE drops SET status = 'Confirmed' WHERE drop_id = %s;",
-            (drop_id_clean,),
-        )
-        conn.commit()
-
-        embed = discord.Embed(
-            title="✅ Drop Approved!",
-            description=f"**Drop ID:** `DROP-{drop_id_clean}`\n**Category:** {drop_data['category']}\n**Approved by:** {interaction.user.mention}",
-            color=discord.Color.green(),
-        )
-        embed.set_image(url=drop_data["image_url"])
-        embed.set_thumbnail(url=thumbnail_url)
-
-        if comment:
-            embed.add_field(name="Comment", value=comment, inline=False)
-
-        staff_channel = discord.utils.get(
-            interaction.guild.text_channels, name="staff-review"
+        board_cache.move_drop(
+            drop_data["guild_id"],
+            drop_data["team_role"],
+            drop_data["category"],
+            drop_data["previous_status"],
+            drop_data["status"],
         )
-        if staff_channel:
-            found_message = None
-            async for message in staff_channel.history(limit=100):
-                if (
-                    message.embeds
-                    and f"**Drop ID:** `DROP-{drop_id_clean}`"
-                    in message.embeds[0].description
-                ):
-                    found_message = message
-                    break
-
-            if found_message:
-                await found_message.add_reaction("✅")
+        drop_events.record_review(drop_data, interaction.user.id, comment)
 
-        team_channel = discord.utils.get(
-            interaction.guild.text_channels,
-            name=drop_data["team_role"].replace(" ", "-"),
-        )
-        if team_channel:
-            submitter = await bot.fetch_user(drop_data["submitter_id"])
-            await team_channel.send(content=f"{submitter.mention}", embed=embed)
+        embed = approved_embed(drop_data, interaction.user, comment)
+        await announce_review(interaction, drop_data, embed, "✅", timer)
 
-        await interaction.response.send_message(
-            f"✅ Drop `DROP-{drop_id_clean}` has been approved.", ephemeral=True
-        )
-
-    finally:
-        cursor.close()
-        conn.close()
+        with timer.step("followup"):
+            await interaction.followup.send(
+                f"✅ Drop `DROP-{drop_id_clean}` has been approved.",
+                ephemeral=True,
+            )
+        timer.log(f"DROP-{drop_id_clean}")
+    except Exception as e:
+        await interaction.followup.send(f"❌ An error occurred: {e}", ephemeral=True)
 
 
 @tree.command(name="reject", description="Reject a drop submission")
@@ -336,65 +959,393 @@ async def confirm(interaction: discord.Interaction, drop_id: str, comment: str =
 async def reject(
     interaction: discord.Interaction, drop_id: str, reason: str = "No reason provided"
 ):
-    conn, cursor = get_db_connection()
+    drop_id_clean = drop_id.upper().replace("DROP-", "").strip()
+    if not valid_drop_id(drop_id_clean):
+        await interaction.response.send_message(
+            f"⚠️ `{drop_id}` is not a valid drop ID.", ephemeral=True
+        )
+        return
+
+    timer = StepTimer("reject")
+    with timer.step("defer"):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
     try:
-        drop_id_clean = drop_id.upper().replace("DROP-", "").strip()
-        cursor.execute("SELECT * FROM drops WHERE drop_id = %s;", (drop_id_clean,))
-        drop_data = cursor.fetchone()
+        with timer.step("db"):
+            drop_data = await db.fetchone(
+                SET_STATUS_QUERY,
+                ("Rejected", int(drop_id_clean), interaction.guild_id),
+            )
 
         if not drop_data:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"⚠️ Drop ID `DROP-{drop_id_clean}` not found.", ephemeral=True
             )
             return
 
-        cursor.execute(
-            "UPDATE drops SET status = 'Rejected' WHERE drop_id = %s;",
-            (drop_id_clean,),
+        board_cache.move_drop(
+            drop_data["guild_id"],
+            drop_data["team_role"],
+            drop_data["category"],
+            drop_data["previous_status"],
+            drop_data["status"],
+        )
+        drop_events.record_review(drop_data, interaction.user.id, reason)
+
+        embed = rejected_embed(drop_data, interaction.user, reason)
+        await announce_review(interaction, drop_data, embed, "❌", timer)
+
+        with timer.step("followup"):
+            await interaction.followup.send(
+                f"❌ Drop `DROP-{drop_id_clean}` has been rejected.",
+                ephemeral=True,
+            )
+        timer.log(f"DROP-{drop_id_clean}")
+    except Exception as e:
+        await interaction.followup.send(f"❌ An error occurred: {e}", ephemeral=True)
+
+
+def queue_embed(drop_data):
+    embed = discord.Embed(
+        title=f"🗂️ Review Queue — DROP-{drop_data['drop_id']}",
+        description=(
+            f"**Category:** {drop_data['category']}\n"
+            f"**Team:** {drop_data['team_role'].title()}\n"
+            f"**Submitted by:** <@{drop_data['submitter_id']}>\n"
+            f"**Submitted at:** {drop_data['timestamp']:%Y-%m-%d %H:%M:%S}"
+        ),
+        color=discord.Color.blue(),
+    )
+    embed.set_image(url=drop_data["image_url"])
+    embed.set_thumbnail(url=thumbnail_url)
+    pending = board_cache.total(drop_data["guild_id"], "Pending")
+    embed.set_footer(text=f"{pending} pending")
+    return embed
+
+
+async def queue_message(drop_data):
+    """The queue embed, plus the stored copy of its image when there is one."""
+    embed = queue_embed(drop_data)
+    image_data = await stored_image(drop_data)
+    if not image_data:
+        return embed, []
+    return embed, [attach_image(embed, drop_data["image_key"], image_data)]
+
+
+class RejectReasonModal(discord.ui.Modal, title="Reject Drop"):
+    reason = discord.ui.TextInput(
+        label="Reason for rejection", required=False, max_length=1000
+    )
+
+    def __init__(self, queue_view):
+        super().__init__()
+        self.queue_view = queue_view
+
+    async def on_submit(self, interaction: discord.Interaction):
+        await self.queue_view.review(
+            interaction, "Rejected", self.reason.value or "No reason provided"
+        )
+
+
+class ReviewQueueView(discord.ui.View):
+    def __init__(self, reviewer_id, drop_data):
+        super().__init__(timeout=900)
+        self.reviewer_id = reviewer_id
+        self.drop_data = drop_data
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.reviewer_id
+
+    async def show_next(self, interaction):
+        current = self.drop_data
+        self.drop_data = await db.fetchone(
+            NEXT_PENDING_QUERY,
+            (current["guild_id"], current["timestamp"], current["drop_id"]),
+        )
+        if self.drop_data is None:
+            self.stop()
+            await interaction.edit_original_response(
+                content="🎉 The review queue is empty.", embed=None, view=None
+            )
+            return
+        embed, files = await queue_message(self.drop_data)
+        # Replacing the attachments also drops the previous drop's image.
+        await interaction.edit_original_response(
+            embed=embed, attachments=files, view=self
+        )
+
+    async def review(self, interaction, status, note=None):
+        await interaction.response.defer()
+        timer = StepTimer("queue")
+
+        try:
+            with timer.step("db"):
+                drop_data = await db.fetchone(
+                    REVIEW_PENDING_QUERY,
+                    (status, self.drop_data["drop_id"], self.drop_data["guild_id"]),
+                )
+
+            if drop_data is None:
+                await interaction.followup.send(
+                    f"⚠️ `DROP-{self.drop_data['drop_id']}` was already reviewed.",
+                    ephemeral=True,
+                )
+            else:
+                board_cache.move_drop(
+                    drop_data["guild_id"],
+                    drop_data["team_role"],
+                    drop_data["category"],
+                    drop_data["previous_status"],
+                    drop_data["status"],
+                )
+                drop_events.record_review(drop_data, interaction.user.id, note)
+                if status == "Confirmed":
+                    embed = approved_embed(drop_data, interaction.user, note)
+                    emoji = "✅"
+                else:
+                    embed = rejected_embed(drop_data, interaction.user, note)
+                    emoji = "❌"
+                await announce_review(interaction, drop_data, embed, emoji, timer)
+
+            with timer.step("followup"):
+                await self.show_next(interaction)
+            timer.log(f"DROP-{self.drop_data['drop_id'] if self.drop_data else '-'}")
+        except Exception as e:
+            await interaction.followup.send(f"❌ An error occurred: {e}", ephemeral=True)
+
+    @discord.ui.button(label="Approve", style=discord.ButtonStyle.success)
+    async def approve(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        await self.review(interaction, "Confirmed")
+
+    @discord.ui.button(label="Reject", style=discord.ButtonStyle.danger)
+    async def reject(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        await interaction.response.send_modal(RejectReasonModal(self))
+
+    @discord.ui.button(label="Skip", style=discord.ButtonStyle.secondary)
+    async def skip(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        await interaction.response.defer()
+        await self.show_next(interaction)
+
+
+@tree.command(name="queue", description="Review pending drops, oldest first.")
+@app_commands.checks.has_role("Staff")
+async def queue(interaction: discord.Interaction):
+    drop_data = await db.fetchone(
+        NEXT_PENDING_QUERY, (interaction.guild_id, datetime.min, 0)
+    )
+    if drop_data is None:
+        await interaction.response.send_message(
+            "🎉 There are no drops waiting for review.", ephemeral=True
+        )
+        return
+
+    embed, files = await queue_message(drop_data)
+    await interaction.response.send_message(
+        embed=embed,
+        files=files,
+        view=ReviewQueueView(interaction.user.id, drop_data),
+        ephemeral=True,
+    )
+
+
+def parse_drop_ids(text):
+    """Parse e.g. ``"DROP-3, 5 7-9"`` into ``[3, 5, 7, 8, 9]``."""
+    drop_ids = set()
+    for token in text.upper().replace("DROP-", "").replace(",", " ").split():
+        start, _, end = token.partition("-")
+        start = int(start)
+        end = int(end) if end else start
+        if end < start or end - start >= MAX_BATCH_REVIEW or end > MAX_DROP_ID:
+            raise ValueError(token)
+        drop_ids.update(range(start, end + 1))
+    if not drop_ids or len(drop_ids) > MAX_BATCH_REVIEW:
+        raise ValueError(text)
+    return sorted(drop_ids)
+
+
+async def review_many(interaction, drop_ids, status, embed_title, color, emoji, note):
+    timer = StepTimer(f"{'confirm' if status == 'Confirmed' else 'reject'}_many")
+    with timer.step("defer"):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+    try:
+        drop_ids = parse_drop_ids(drop_ids)
+    except ValueError:
+        await interaction.followup.send(
+            f"⚠️ Give up to {MAX_BATCH_REVIEW} drop IDs, e.g. `DROP-3, DROP-5, 7-12`.",
+            ephemeral=True,
+        )
+        return
+
+    with timer.step("db"):
+        rows = await db.fetchall(
+            SET_STATUS_MANY_QUERY, (status, drop_ids, interaction.guild_id)
         )
-        conn.commit()
 
+    comment = note[1] if note else None
+    by_team = {}
+    for row in rows:
+        board_cache.move_drop(
+            row["guild_id"],
+            row["team_role"],
+            row["category"],
+            row["previous_status"],
+            row["status"],
+        )
+        drop_events.record_review(row, interaction.user.id, comment)
+        by_team.setdefault(row["team_role"], []).append(row)
+
+    index = guild_indexes[interaction.guild]
+    staff_channel = index.channel("staff-review")
+    for team, team_rows in by_team.items():
+        team_channel = index.team_channel(team)
+        if not team_channel:
+            continue
+
+        team_rows.sort(key=lambda row: row["drop_id"])
+        lines = [
+            f"`DROP-{row['drop_id']}` — {row['category']} — <@{row['submitter_id']}>"
+            for row in team_rows
+        ]
+        description = "\n".join(lines)
+        if len(description) > 4000:
+            description = description[:3997] + "..."
         embed = discord.Embed(
-            title="❌ Drop Rejected",
-            description=f"**Drop ID:** `DROP-{drop_id_clean}`\n**Category:** {drop_data['category']}\n**Rejected by:** {interaction.user.mention}",
-            color=discord.Color.red(),
+            title=f"{embed_title} ({len(team_rows)})",
+            description=f"{description}\n\n**Reviewed by:** {interaction.user.mention}",
+            color=color,
         )
-        embed.set_image(url=drop_data["image_url"])
         embed.set_thumbnail(url=thumbnail_url)
-        embed.add_field(name="Reason", value=reason, inline=False)
+        if note:
+            embed.add_field(name=note[0], value=note[1], inline=False)
 
-        staff_channel = discord.utils.get(
-            interaction.guild.text_channels, name="staff-review"
+        submitters = " ".join(
+            dict.fromkeys(f"<@{row['submitter_id']}>" for row in team_rows)
         )
-        if staff_channel:
-            found_message = None
-            async for message in staff_channel.history(limit=100):
-                if (
-                    message.embeds
-                    and f"**Drop ID:** `DROP-{drop_id_clean}`"
-                    in message.embeds[0].description
-                ):
-                    found_message = message
-                    break
+        dispatcher.send(team_channel, content=submitters, embed=embed)
 
-            if found_message:
-                await found_message.add_reaction("❌")
+    if staff_channel:
+        with timer.step("notify"):
+            for row in rows:
+                message = await find_review_message(staff_channel, row)
+                if message:
+                    dispatcher.react(message, emoji)
+
+    found = {row["drop_id"] for row in rows}
+    missing = [drop_id for drop_id in drop_ids if drop_id not in found]
+    summary = f"{emoji} {status} {len(rows)} drop(s)."
+    if missing:
+        summary += " Not found: " + ", ".join(f"`DROP-{i}`" for i in missing)
+    if len(summary) > 2000:
+        summary = summary[:1997] + "..."
+
+    with timer.step("followup"):
+        await interaction.followup.send(summary, ephemeral=True)
+    timer.log(f"{len(rows)} drops")
+
+
+@tree.command(name="confirm_many", description="Confirm several drop submissions")
+@app_commands.describe(
+    drop_ids="Drop IDs or ranges, e.g. DROP-3, DROP-5, 7-12",
+    comment="Additional comment",
+)
+@app_commands.checks.has_role("Staff")
+async def confirm_many(
+    interaction: discord.Interaction, drop_ids: str, comment: str = None
+):
+    await review_many(
+        interaction,
+        drop_ids,
+        "Confirmed",
+        "✅ Drops Approved!",
+        discord.Color.green(),
+        "✅",
+        ("Comment", comment) if comment else None,
+    )
 
-        team_channel = discord.utils.get(
-            interaction.guild.text_channels,
-            name=drop_data["team_role"].replace(" ", "-"),
-        )
-        if team_channel:
-            submitter = await bot.fetch_user(drop_data["submitter_id"])
-            await team_channel.send(content=f"{submitter.mention}", embed=embed)
 
+@tree.command(name="reject_many", description="Reject several drop submissions")
+@app_commands.describe(
+    drop_ids="Drop IDs or ranges, e.g. DROP-3, DROP-5, 7-12",
+    reason="Reason for rejection",
+)
+@app_commands.checks.has_role("Staff")
+async def reject_many(
+    interaction: discord.Interaction,
+    drop_ids: str,
+    reason: str = "No reason provided",
+):
+    await review_many(
+        interaction,
+        drop_ids,
+        "Rejected",
+        "❌ Drops Rejected",
+        discord.Color.red(),
+        "❌",
+        ("Reason", reason),
+    )
+
+
+EVENT_LABELS = {
+    "submit": "📥 Submitted",
+    "confirm": "✅ Confirmed",
+    "reject": "❌ Rejected",
+}
+
+
+@tree.command(name="history", description="Show the review history of a drop")
+@app_commands.describe(drop_id="ID of the drop")
+@app_commands.checks.has_role("Staff")
+async def history(interaction: discord.Interaction, drop_id: str):
+    drop_id_clean = drop_id.upper().replace("DROP-", "").strip()
+    if not valid_drop_id(drop_id_clean):
         await interaction.response.send_message(
-            f"❌ Drop `DROP-{drop_id_clean}` has been rejected.", ephemeral=True
+            f"⚠️ `{drop_id}` is not a valid drop ID.", ephemeral=True
         )
+        return
 
-    finally:
-        cursor.close()
-        conn.close()
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    await drop_events.flush()
+    rows = await db.fetchall(
+        """
+        SELECT event_type, actor_id, old_status, new_status, comment, created_at
+        FROM drop_events
+        WHERE guild_id = %s AND drop_id = %s
+        ORDER BY created_at, event_id;
+        """,
+        (interaction.guild_id, int(drop_id_clean)),
+    )
+    if not rows:
+        await interaction.followup.send(
+            f"⚠️ No history found for `DROP-{drop_id_clean}`.", ephemeral=True
+        )
+        return
+
+    lines = []
+    for row in rows:
+        label = EVENT_LABELS.get(row["event_type"], row["event_type"])
+        line = f"`{row['created_at']:%Y-%m-%d %H:%M}` {label}"
+        if row["actor_id"]:
+            line += f" by <@{row['actor_id']}>"
+        if row["comment"]:
+            line += f" — {row['comment']}"
+        lines.append(line)
+    description = "\n".join(lines)
+    if len(description) > 4000:
+        description = description[:3997] + "..."
+
+    embed = discord.Embed(
+        title=f"📜 History of DROP-{drop_id_clean}",
+        description=description,
+        color=discord.Color.blue(),
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 @tree.command(name="check", description="Check progress for a team and category.")
@@ -402,52 +1353,34 @@ async def reject(
     team="Select the team",
     category="Select the category",
 )
-@app_commands.choices(
-    team=[app_commands.Choice(name=team.title(), value=team) for team in TEAM_NAMES],
-    category=[app_commands.Choice(name=cat, value=cat) for cat in CATEGORIES],
-)
+@app_commands.autocomplete(team=team_autocomplete, category=category_autocomplete)
 @app_commands.checks.has_role("Staff")
 async def check(
     interaction: discord.Interaction,
-    team: app_commands.Choice[str],
-    category: app_commands.Choice[str],
+    team: str,
+    category: str,
 ):
-    conn, cursor = get_db_connection()
-    try:
-        cursor.execute(
-            """
-            SELECT progress, COUNT(*) AS count, status
-            FROM drops
-            WHERE team_role = %s AND category = %s
-            GROUP BY progress, status;
-            """,
-            (team.value.lower(), category.value),
-        )
-        results = cursor.fetchall()
+    config = guild_configs[interaction.guild_id]
+    team = match_option(team, config.teams) or team.strip().lower()
+    category = match_option(category, config.categories) or category
+    counts, progress_tracker = board_cache.cell(interaction.guild_id, team, category)
 
-        if not results:
-            await interaction.response.send_message(
-                f"No submissions found for team `{team.name}` and category `{category.name}`.",
-                ephemeral=True,
-            )
-            return
-
-        progress_message = f"📊 **Progress for {team.name} in {category.name}:**\n\n"
-        progress_tracker = None
+    if not counts and not progress_tracker:
+        await interaction.response.send_message(
+            f"No submissions found for team `{team.title()}` and category `{category}`.",
+            ephemeral=True,
+        )
+        return
 
-        for row in results:
-            if row["progress"] is not None:
-                progress_tracker = row["progress"]
-            progress_message += f"- **{row['status']}:** {row['count']} submissions\n"
+    progress_message = f"📊 **Progress for {team.title()} in {category}:**\n\n"
 
-        if progress_tracker:
-            progress_message += f"\n📈 **Overall Progress:** {progress_tracker}\n"
+    for status, count in counts.items():
+        progress_message += f"- **{status}:** {count} submissions\n"
 
-        await interaction.response.send_message(progress_message, ephemeral=True)
+    if progress_tracker:
+        progress_message += f"\n📈 **Overall Progress:** {progress_tracker}\n"
 
-    finally:
-        cursor.close()
-        conn.close()
+    await interaction.response.send_message(progress_message, ephemeral=True)
 
 
 @tree.command(
@@ -459,122 +1392,532 @@ async def check(
     category="Select the category",
     progress="The updated progress value (e.g., 1/4, 2/4, etc.)",
 )
-@app_commands.choices(
-    team_role=[
-        app_commands.Choice(name=team.title(), value=team) for team in TEAM_NAMES
-    ],
-    category=[app_commands.Choice(name=cat, value=cat) for cat in CATEGORIES],
-)
+@app_commands.autocomplete(team_role=team_autocomplete, category=category_autocomplete)
 @app_commands.checks.has_role("Staff")
 async def update(
     interaction: discord.Interaction,
-    team_role: app_commands.Choice[str],
-    category: app_commands.Choice[str],
+    team_role: str,
+    category: str,
     progress: str,
 ):
-    conn, cursor = get_db_connection()
-    try:
-        cursor.execute(
-            """
-            SELECT * FROM drops WHERE team_role = %s AND category = %s;
-            """,
-            (team_role.value.lower(), category.value),
+    config = guild_configs[interaction.guild_id]
+    team_role = match_option(team_role, config.teams)
+    category = match_option(category, config.categories)
+    if not team_role or not category:
+        await interaction.response.send_message(
+            "⚠️ Please pick one of the listed teams and categories.", ephemeral=True
         )
-        existing_data = cursor.fetchall()
+        return
 
-        if not existing_data:
-            await interaction.response.send_message(
-                f"No data found for team `{team_role.name}` and category `{category.name}`.",
-                ephemeral=True,
-            )
-            return
+    await db.execute(
+        """
+        INSERT INTO team_progress (guild_id, team_role, category, progress)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (guild_id, team_role, category)
+        DO UPDATE SET progress = EXCLUDED.progress, updated_at = CURRENT_TIMESTAMP;
+        """,
+        (interaction.guild_id, team_role, category, progress),
+    )
+    board_cache.set_progress(interaction.guild_id, team_role, category, progress)
+    drop_events.record(
+        "progress",
+        interaction.guild_id,
+        actor_id=interaction.user.id,
+        team_role=team_role,
+        category=category,
+        comment=progress,
+    )
 
-        cursor.execute(
-            """
-            UPDATE drops
-            SET progress = %s
-            WHERE team_role = %s AND category = %s;
-            """,
-            (progress, team_role.value.lower(), category.value),
+    await interaction.response.send_message(
+        f"✅ Progress for `{category}` in team `{team_role.title()}` has been updated to `{progress}`.",
+        ephemeral=True,
+    )
+
+
+STATUS_EMOJI = {"Confirmed": "✅", "Pending": "⏳", "Rejected": "❌"}
+WOM_METRICS = data.skills + data.bosses
+
+
+def wom_footer(embed):
+    embed.set_footer(
+        text=f"WiseOldMan data from {wom_snapshot['updated_at']:%H:%M} UTC"
+    )
+
+
+async def metric_autocomplete(interaction: discord.Interaction, current: str):
+    current = current.lower().replace(" ", "_")
+    return [
+        app_commands.Choice(name=metric.replace("_", " ").title(), value=metric)
+        for metric in WOM_METRICS
+        if current in metric
+    ][:25]
+
+
+@tree.command(name="leaderboard", description="Team rankings for a skill or boss.")
+@app_commands.describe(metric="Skill or boss to rank teams by")
+@app_commands.autocomplete(metric=metric_autocomplete)
+async def leaderboard(interaction: discord.Interaction, metric: str = "overall"):
+    summary = wom_snapshot["summary"]
+    if summary is None:
+        await interaction.response.send_message(
+            "⏳ Leaderboard data is still loading, please try again shortly.",
+            ephemeral=True,
+        )
+        return
+
+    rows = summary[summary["metric"] == metric]
+    if rows.empty:
+        await interaction.response.send_message(
+            f"⚠️ Unknown metric `{metric}`.", ephemeral=True
+        )
+        return
+
+    unit = "kills" if rows["kind"].iloc[0] == "kills" else "XP"
+    lines = [
+        f"**{row.rank}.** {row.team} — {int(row.total):,} {unit} "
+        f"({row.per_capita:,.0f} per player)"
+        for row in rows.itertuples()
+    ]
+
+    embed = discord.Embed(
+        title=f"🏆 {metric.replace('_', ' ').title()} Leaderboard",
+        description="\n".join(lines),
+        color=discord.Color.gold(),
+    )
+    embed.set_thumbnail(url=thumbnail_url)
+
+    leaders = wom_snapshot["leaders"]
+    top = leaders[leaders["metric"] == metric]
+    if not top.empty:
+        leader = top.iloc[0]
+        embed.add_field(
+            name="Top Player",
+            value=f"{leader['player']} ({leader['team']}) — {int(leader['gained']):,} {unit}",
+            inline=False,
+        )
+
+    wom_footer(embed)
+    await interaction.response.send_message(embed=embed)
+
+
+@tree.command(name="team_stats", description="WiseOldMan gains for a team.")
+@app_commands.describe(team="Select the team")
+@app_commands.autocomplete(team=team_autocomplete)
+async def team_stats(interaction: discord.Interaction, team: str):
+    team = match_option(team, guild_configs[interaction.guild_id].teams)
+    if not team:
+        await interaction.response.send_message(
+            "⚠️ Please pick one of the listed teams.", ephemeral=True
         )
-        conn.commit()
+        return
 
+    summary = wom_snapshot["summary"]
+    if summary is None:
         await interaction.response.send_message(
-            f"✅ Progress for `{category.name}` in team `{team_role.name}` has been updated to `{progress}`.",
+            "⏳ Team stats are still loading, please try again shortly.",
             ephemeral=True,
         )
-    finally:
-        cursor.close()
-        conn.close()
+        return
+
+    rows = summary[summary["team"].str.lower() == team.lower()]
+    embed = discord.Embed(
+        title=f"📈 {team.title()} Gains",
+        color=discord.Color.blue(),
+    )
+    embed.set_thumbnail(url=thumbnail_url)
+
+    xp = rows[rows["kind"] == "xp"]
+    kills = rows[(rows["kind"] == "kills") & (rows["total"] > 0)]
+    kills = kills.sort_values("total", ascending=False).head(10)
+
+    embed.add_field(
+        name="Experience",
+        value="\n".join(
+            f"**{row.metric.title()}:** {int(row.total):,} (#{row.rank})"
+            for row in xp.itertuples()
+        )
+        or "No gains yet.",
+        inline=True,
+    )
+    embed.add_field(
+        name="Top Bosses",
+        value="\n".join(
+            f"**{row.metric.replace('_', ' ').title()}:** {int(row.total):,} (#{row.rank})"
+            for row in kills.itertuples()
+        )
+        or "No kills yet.",
+        inline=True,
+    )
+
+    wom_footer(embed)
+    await interaction.response.send_message(embed=embed)
+
+
+@tree.command(name="board", description="Show every team's progress on the board.")
+@app_commands.checks.has_role("Staff")
+async def board(interaction: discord.Interaction):
+    embed = discord.Embed(
+        title="🗺️ Bingo Board",
+        color=discord.Color.gold(),
+    )
+    embed.set_thumbnail(url=thumbnail_url)
+
+    config = guild_configs[interaction.guild_id]
+    for team in config.teams:
+        lines = []
+        for category in config.categories:
+            counts, progress = board_cache.cell(interaction.guild_id, team, category)
+            if not counts and not progress:
+                continue
+            line = f"**{category}:** " + " ".join(
+                f"{STATUS_EMOJI[status]}{counts[status]}"
+                for status in STATUSES
+                if counts[status]
+            )
+            if progress:
+                line += f" 📈 {progress}"
+            lines.append(line)
+
+        value = "\n".join(lines) or "No submissions yet."
+        if len(value) > 1024:
+            value = value[:1021] + "..."
+        embed.add_field(name=team.title(), value=value, inline=False)
+
+    if board_cache.loaded_at:
+        embed.set_footer(
+            text=f"Synced with database at {board_cache.loaded_at:%H:%M:%S} UTC"
+        )
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if math.isinf(seconds):
+        return f">{metrics.LATENCY_BUCKETS[-1]:g}s"
+    return f"≤{seconds * 1000:.0f}ms" if seconds < 1 else f"≤{seconds:g}s"
+
+
+@tree.command(name="stats", description="Show bot performance statistics.")
+@app_commands.checks.has_role("Staff")
+async def stats(interaction: discord.Interaction):
+    embed = discord.Embed(title="📊 Bot Stats", color=discord.Color.blue())
+
+    calls = metrics.command_calls.values
+    errors = {}
+    for (command, _), count in metrics.command_errors.values.items():
+        errors[command] = errors.get(command, 0) + count
+
+    lines = []
+    for (command,), count in sorted(calls.items(), key=lambda item: -item[1])[:10]:
+        line = (
+            f"**/{command}:** {count:.0f} calls, {errors.get(command, 0):.0f} errors, "
+            f"p50 {format_seconds(metrics.command_seconds.quantile(0.5, command))}, "
+            f"p95 {format_seconds(metrics.command_seconds.quantile(0.95, command))}"
+        )
+        stages = [
+            f"{stage} "
+            + format_seconds(metrics.stage_seconds.quantile(0.95, command, stage))
+            for stage in ("db", "rest", "response")
+            if metrics.stage_seconds.count(command, stage)
+        ]
+        if stages:
+            line += f" ({', '.join(stages)})"
+        lines.append(line)
+    value = "\n".join(lines) or "No commands yet."
+    if len(value) > 1024:
+        value = value[:1021] + "..."
+    embed.add_field(name="Commands", value=value, inline=False)
+
+    pool = db.pool_stats()
+    hit_rate = users.hit_rate()
+    system = [
+        f"**Gateway:** {bot.latency * 1000:.0f} ms, {bot.shard_count or 1} shard(s)",
+        f"**Event loop lag:** {loop_monitor.last_lag * 1000:.0f} ms "
+        f"(max {loop_monitor.max_lag * 1000:.0f} ms, {loop_monitor.stalls} stalls)",
+        f"**DB pool:** {pool['in_use']}/{pool['size']} in use, "
+        f"{pool['waiting']} waiting",
+        "**User cache hit rate:** "
+        + (f"{hit_rate:.0%}" if hit_rate is not None else "n/a"),
+        f"**Rate limited:** {discord_rate_limits.hits} Discord, "
+        f"{dispatcher.rate_limited} queued sends, "
+        f"{wom_client.stats['rate_limited']} WOM",
+        f"**Queued:** {dispatcher.pending()} Discord calls, "
+        f"{drop_events.pending()} drop events "
+        f"({dispatcher.coalesced} notifications coalesced)",
+    ]
+    embed.add_field(name="System", value="\n".join(system), inline=False)
+    embed.set_footer(
+        text="Latencies are histogram bucket bounds; stage times in brackets are p95."
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+DROPS_PAGE_SIZE = 8
+DROP_COLUMNS = (
+    "drop_id, submitter_id, team_role, category, image_url, image_key, "
+    "status, timestamp"
+)
+
+TABLE_HEADER = (
+    f"{'Drop ID':<10}{'Submitter ID':<20}{'Team Role':<25}{'Category':<15}{'Status':<10}{'Timestamp':<20}\n"
+    + "-" * 120
+    + "\n"
+)
+
+
+def drop_filters(guild_id, team_role=None, status=None, category=None):
+    clauses, params = ["guild_id = %s"], [guild_id]
+    for column, value in (
+        ("team_role", team_role),
+        ("status", status),
+        ("category", category),
+    ):
+        if value is not None:
+            clauses.append(f"{column} = %s")
+            params.append(value)
+    return clauses, params
+
+
+def _fetch_drops_page(cursor, filters, after=None, before=None):
+    clauses, params = list(filters[0]), list(filters[1])
+    if after is not None:
+        clauses.append("drop_id > %s")
+        params.append(after)
+    if before is not None:
+        clauses.append("drop_id < %s")
+        params.append(before)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = "DESC" if before is not None else "ASC"
+    cursor.execute(
+        f"SELECT {DROP_COLUMNS} FROM drops {where} ORDER BY drop_id {order} LIMIT %s;",
+        (*params, DROPS_PAGE_SIZE + 1),
+    )
+    rows = cursor.fetchall()
+
+    has_more = len(rows) > DROPS_PAGE_SIZE
+    rows = rows[:DROPS_PAGE_SIZE]
+    if before is not None:
+        rows.reverse()
+    return rows, has_more
+
+
+def render_drops_page(rows, page):
+    lines = []
+    for row in rows:
+        lines.append(
+            f"{row['drop_id']:<10}{row['submitter_id']:<20}{row['team_role']:<25}{row['category'] or 'None':<15}"
+            f"{row['status']:<10}{row['timestamp'].strftime('%Y-%m-%d %H:%M:%S'):<20}"
+        )
+        lines.append(f"Image URL: {row['image_url']}")
+        if row["image_key"]:
+            lines.append(f"Stored image: {row['image_key']}")
+
+    table = TABLE_HEADER + "\n".join(lines)
+    if len(table) > 4090:
+        table = table[:4087] + "..."
+
+    embed = discord.Embed(
+        title="📋 Current Drop Data",
+        description=f"```{table}```",
+        color=discord.Color.blue(),
+    )
+    embed.set_footer(text=f"Page {page}")
+    return embed
+
+
+class DropPageView(discord.ui.View):
+    def __init__(self, owner_id, filters, rows, has_next):
+        super().__init__(timeout=300)
+        self.owner_id = owner_id
+        self.filters = filters
+        self.page = 1
+        self.first_id = rows[0]["drop_id"]
+        self.last_id = rows[-1]["drop_id"]
+        self.previous_page.disabled = True
+        self.next_page.disabled = not has_next
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.owner_id
+
+    async def _show(self, interaction, rows):
+        self.first_id = rows[0]["drop_id"]
+        self.last_id = rows[-1]["drop_id"]
+        await interaction.response.edit_message(
+            embed=render_drops_page(rows, self.page), view=self
+        )
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def previous_page(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        rows, has_more = await db.run(
+            _fetch_drops_page, self.filters, None, self.first_id
+        )
+        if not rows:
+            button.disabled = True
+            await interaction.response.edit_message(view=self)
+            return
+        self.page -= 1
+        button.disabled = not has_more
+        self.next_page.disabled = False
+        await self._show(interaction, rows)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        rows, has_more = await db.run(_fetch_drops_page, self.filters, self.last_id)
+        if not rows:
+            button.disabled = True
+            await interaction.response.edit_message(view=self)
+            return
+        self.page += 1
+        button.disabled = not has_more
+        self.previous_page.disabled = False
+        await self._show(interaction, rows)
 
 
 @tree.command(
     name="show_current_data", description="Displays all current data in table format."
 )
-async def show_current_data(interaction: discord.Interaction):
-    conn, cursor = get_db_connection()
+@app_commands.describe(
+    team="Only show drops for this team",
+    status="Only show drops with this status",
+    category="Only show drops in this category",
+)
+@app_commands.choices(
+    status=[app_commands.Choice(name=status, value=status) for status in STATUSES],
+)
+@app_commands.autocomplete(team=team_autocomplete, category=category_autocomplete)
+async def show_current_data(
+    interaction: discord.Interaction,
+    team: str = None,
+    status: app_commands.Choice[str] = None,
+    category: str = None,
+):
+    filters = drop_filters(
+        interaction.guild_id,
+        team.strip().lower() if team else None,
+        status.value if status else None,
+        category,
+    )
     try:
-        cursor.execute("SELECT * FROM drops")
-        data = cursor.fetchall()
+        rows, has_next = await db.run(_fetch_drops_page, filters)
 
-        if not data:
+        if not rows:
             await interaction.response.send_message(
                 "No data available.", ephemeral=True
             )
             return
 
-        table_header = (
-            f"{'Drop ID':<10}{'Submitter ID':<20}{'Team Role':<25}{'Category':<15}{'Status':<10}{'Timestamp':<20}\n"
-            + "-" * 120
-            + "\n"
+        view = DropPageView(interaction.user.id, filters, rows, has_next)
+        await interaction.response.send_message(
+            embed=render_drops_page(rows, 1), view=view, ephemeral=True
+        )
+    except Exception as e:
+        await interaction.response.send_message(
+            f"❌ An error occurred while retrieving the data: {e}", ephemeral=True
         )
-        table_rows = ""
 
-        for row in data:
-            table_rows += (
-                f"{row['drop_id']:<10}{row['submitter_id']:<20}{row['team_role']:<25}{row['category'] or 'None':<15}"
-                f"{row['status']:<10}{row['timestamp'].strftime('%Y-%m-%d %H:%M:%S'):<20}\n"
-            )
-            table_rows += f"Image URL: {row['image_url']}\n"
 
-        full_table = table_header + table_rows
+logging.basicConfig(level=logging.INFO)
 
-        chunks = []
-        current_chunk = "```"
-        for line in full_table.splitlines():
-            if len(current_chunk) + len(line) + 3 > 2000:
-                current_chunk += "```"
-                chunks.append(current_chunk)
-                current_chunk = "```" + table_header
-            current_chunk += line + "\n"
 
-        if current_chunk.strip():
-            current_chunk += "```"
-            chunks.append(current_chunk)
+def split_list(text):
+    return [item.strip() for item in text.split(",") if item.strip()]
 
+
+@tree.command(
+    name="configure",
+    description="Set this server's teams, captains, categories or owner (Owner only)",
+)
+@app_commands.describe(
+    teams="Comma-separated team names, matching the team role names",
+    captains="Comma-separated team captains for /randomise",
+    categories="Comma-separated board categories",
+    owner="Member allowed to configure, reset and export this event",
+)
+async def configure(
+    interaction: discord.Interaction,
+    teams: str = None,
+    captains: str = None,
+    categories: str = None,
+    owner: discord.Member = None,
+):
+    config = guild_configs[interaction.guild_id]
+    if not config.is_owner(interaction.user.id, interaction.guild.owner_id):
         await interaction.response.send_message(
-            "Here is the current data:", ephemeral=True
-        )
-        for chunk in chunks:
-            await interaction.followup.send(chunk, ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(
-            f"❌ An error occurred while retrieving the data: {e}", ephemeral=True
+            "⛔ You do not have permission to use this command.", ephemeral=True
         )
-    finally:
-        cursor.close()
-        conn.close()
+        return
 
+    changes = {}
+    if teams is not None:
+        changes["teams"] = [team.lower() for team in split_list(teams)]
+    if captains is not None:
+        changes["captains"] = split_list(captains)
+    if categories is not None:
+        changes["categories"] = split_list(categories)
+    if owner is not None:
+        changes["owner_id"] = owner.id
+
+    if changes:
+        config = config.replace(**changes)
+        try:
+            await db.run(save_config, config)
+        except Exception as e:
+            await interaction.response.send_message(
+                f"❌ An error occurred while saving the configuration: {e}",
+                ephemeral=True,
+            )
+            return
+        guild_configs.set(config)
+        guild_indexes.rebuild(interaction.guild)
 
-import logging
+    owner_id = config.owner_id or interaction.guild.owner_id
+    embed = discord.Embed(
+        title="⚙️ Event Configuration",
+        description=f"**Owner:** <@{owner_id}>",
+        color=discord.Color.blue(),
+    )
+    for name, values in (
+        ("Teams", [team.title() for team in config.teams]),
+        ("Captains", config.captains),
+        ("Categories", config.categories),
+    ):
+        value = ", ".join(values) or "None"
+        if len(value) > 1024:
+            value = value[:1021] + "..."
+        embed.add_field(name=name, value=value, inline=False)
 
-logging.basicConfig(level=logging.INFO)
+    await interaction.response.send_message(
+        content="✅ Configuration saved." if changes else None,
+        embed=embed,
+        ephemeral=True,
+    )
+
+
+def _reset_drops(cursor, guild_id):
+    for table in ("drops", "team_progress", "drop_events"):
+        cursor.execute(f"DELETE FROM {table} WHERE guild_id = %s;", (guild_id,))
+    # Drop IDs are shared by every guild, so the counter can only rewind
+    # past the highest ID still in use; with one guild that means back to 1.
+    cursor.execute(
+        """
+        SELECT setval('drops_drop_id_seq', COALESCE(MAX(drop_id), 0) + 1, false)
+        FROM drops;
+        """
+    )
+    refresh_board(cursor)
 
 
 @tree.command(name="reset_data", description="Reset all drop data (Owner only)")
 async def reset_data(interaction: discord.Interaction):
-    owner_id = 252465642802774017
-    if interaction.user.id != owner_id:
+    config = guild_configs[interaction.guild_id]
+    if not config.is_owner(interaction.user.id, interaction.guild.owner_id):
         await interaction.response.send_message(
             "⛔ You do not have permission to use this command.", ephemeral=True
         )
@@ -585,22 +1928,22 @@ async def reset_data(interaction: discord.Interaction):
         async def confirm_reset(
             self, button_interaction: discord.Interaction, button: discord.ui.Button
         ):
-            if button_interaction.user.id != owner_id:
+            if not config.is_owner(
+                button_interaction.user.id, interaction.guild.owner_id
+            ):
                 await button_interaction.response.send_message(
                     "⛔ You do not have permission to use this button.", ephemeral=True
                 )
                 return
 
             try:
-                conn, cursor = get_db_connection()
-
-                cursor.execute("DELETE FROM drops;")
-
-                cursor.execute("ALTER SEQUENCE drops_drop_id_seq RESTART WITH 1;")
-
-                conn.commit()
-                cursor.close()
-                conn.close()
+                await drop_events.flush()
+                await db.run(_reset_drops, interaction.guild_id)
+                board_cache.clear(interaction.guild_id)
+                # Drop IDs are reused after a reset, so cached staff messages
+                # would point new drops at the old ones.
+                review_messages.clear()
+                image_indexes.pop(interaction.guild_id, None)
 
                 await button_interaction.response.edit_message(
                     content="✅ All drop data and the drop counter have been reset successfully.",
@@ -628,58 +1971,88 @@ async def reset_data(interaction: discord.Interaction):
     name="download_data",
     description="View or download the current drop data (Owner only)",
 )
-async def download_data(interaction: discord.Interaction):
-    owner_id = 252465642802774017
-    if interaction.user.id != owner_id:
+@app_commands.describe(
+    format="File format for the export",
+    compress="Gzip the exported file",
+    team="Only export drops for this team",
+    status="Only export drops with this status",
+    start_date="Only export drops submitted on or after this date (YYYY-MM-DD)",
+    end_date="Only export drops submitted on or before this date (YYYY-MM-DD)",
+)
+@app_commands.choices(
+    format=[app_commands.Choice(name=fmt.upper(), value=fmt) for fmt in FORMATS],
+    status=[app_commands.Choice(name=status, value=status) for status in STATUSES],
+)
+@app_commands.autocomplete(team=team_autocomplete)
+async def download_data(
+    interaction: discord.Interaction,
+    format: app_commands.Choice[str] = None,
+    compress: bool = False,
+    team: str = None,
+    status: app_commands.Choice[str] = None,
+    start_date: str = None,
+    end_date: str = None,
+):
+    config = guild_configs[interaction.guild_id]
+    if not config.is_owner(interaction.user.id, interaction.guild.owner_id):
         await interaction.response.send_message(
             "⛔ You do not have permission to use this command.", ephemeral=True
         )
         return
 
-    conn, cursor = get_db_connection()
+    clauses, params = drop_filters(
+        interaction.guild_id,
+        team.strip().lower() if team else None,
+        status.value if status else None,
+    )
     try:
-        cursor.execute("SELECT * FROM drops;")
-        drops = cursor.fetchall()
-
-        if not drops:
-            await interaction.response.send_message(
-                "No drop data found.", ephemeral=True
-            )
-            return
-
-        data = [
-            {
-                "drop_id": f"DROP-{row['drop_id']}",
-                "submitter_id": row["submitter_id"],
-                "team_role": row["team_role"],
-                "category": row["category"],
-                "image_url": row["image_url"],
-                "status": row["status"],
-                "timestamp": row["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
-            }
-            for row in drops
-        ]
+        if start_date:
+            clauses.append("timestamp >= %s")
+            params.append(datetime.strptime(start_date, "%Y-%m-%d"))
+        if end_date:
+            clauses.append("timestamp < %s")
+            params.append(datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1))
+    except ValueError:
+        await interaction.response.send_message(
+            "⚠️ Dates must be in `YYYY-MM-DD` format.", ephemeral=True
+        )
+        return
 
-        formatted_data = json.dumps(data, indent=4)
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        files = await executor.run_blocking(
+            export_drops,
+            clauses,
+            params,
+            format.value if format else "json",
+            compress,
+            # discord.py's per-tier limit can be larger than what Discord accepts.
+            min(interaction.guild.filesize_limit, MAX_UPLOAD_BYTES),
+        )
 
-        with open("drop_data.json", "w") as f:
-            f.write(formatted_data)
+        if not files:
+            await interaction.followup.send("No drop data found.", ephemeral=True)
+            return
 
-        await interaction.response.send_message(
-            "Data has been exported. Downloading file...", ephemeral=True
+        await interaction.followup.send(
+            f"Data has been exported into {len(files)} file(s). Downloading...",
+            ephemeral=True,
         )
-
-        with open("drop_data.json", "rb") as f:
+        for filename, buffer in files:
             await interaction.followup.send(
-                file=discord.File(f, "drop_data.json"), ephemeral=True
+                file=discord.File(buffer, filename), ephemeral=True
             )
     except Exception as e:
-        await interaction.response.send_message(
-            f"❌ Error exporting data: {e}", ephemeral=True
-        )
-    finally:
-        cursor.close()
-        conn.close()
+        await interaction.followup.send(f"❌ Error exporting data: {e}", ephemeral=True)
 
 
-bot.run(TOKEN)
+bot_loaded_at = time.perf_counter()
+try:
+    bot.run(TOKEN)
+finally:
+    try:
+        drop_events.close()
+    except Exception:
+        logging.exception("Could not write pending drop events on shutdown")
+    db.close_pool()
+    executor.shutdown()
@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class UserResolver:
+    """Resolve user IDs via the gateway cache, then a TTL'd LRU, then REST."""
+
+    def __init__(self, client, maxsize=1024, ttl=3600):
+        self.client = client
+        self.ttl = ttl
+        self._cache = LRUCache(maxsize)
+        self.stats = {"gateway": 0, "lru": 0, "rest": 0, "miss": 0}
+
+    async def resolve(self, user_id, guild=None, fetch=True):
+        """Return the user, or None if ``fetch`` is off and nothing is cached."""
+        user = guild.get_member(user_id) if guild else None
+        user = user or self.client.get_user(user_id)
+        if user is not None:
+            self.stats["gateway"] += 1
+            return user
+
+        cached = self._cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            self.stats["lru"] += 1
+            return cached[0]
+
+        if not fetch:
+            self.stats["miss"] += 1
+            return None
+
+        user = await self.client.fetch_user(user_id)
+        self.stats["rest"] += 1
+        self._cache.set(user_id, (user, time.monotonic()))
+        return user
+
+    def remember(self, user):
+        """Keep a user we already hold, e.g. from an interaction, for later."""
+        self._cache.set(user.id, (user, time.monotonic()))
+
+    def hit_rate(self):
+        hits = self.stats["gateway"] + self.stats["lru"]
+        total = hits + self.stats["rest"] + self.stats["miss"]
+        return hits / total if total else None
@@ -1,11 +1,14 @@
-import requests
-import time
-import pandas as pd
+import argparse
+import asyncio
+import logging
+import os
 
-base_url = "https://api.wiseoldman.net/v2/players/"
-date_range = (
-    "?startDate=2024-11-15T00%3A00%3A00.000Z&endDate=2024-11-18T23%3A59%3A00.000Z"
-)
+from wom import ResponseCache, WiseOldManClient
+
+log = logging.getLogger(__name__)
+
+start_date = "2024-11-15T00:00:00.000Z"
+end_date = "2024-11-18T23:59:00.000Z"
 
 teams = {
     "Rocnars Ramblers": [
@@ -166,55 +169,228 @@ skills = [
     "ehb",
 ]
 
-kill_data = []
-xp_data = []
-kill_team_totals = {team: {boss: 0 for boss in bosses} for team in teams.keys()}
-xp_team_totals = {team: {skill: 0 for skill in skills} for team in teams.keys()}
-
-for team, players in teams.items():
-    for player in players:
-        url = base_url + player.replace(" ", "%20") + "/gained" + date_range
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            try:
-                player_kills = {"Player": player, "Team": team}
-                for boss in bosses:
-                    kills = (
-                        data["data"]["bosses"]
-                        .get(boss, {})
-                        .get("kills", {})
-                        .get("gained", 0)
-                    )
-                    player_kills[boss] = kills
-                    kill_team_totals[team][boss] += kills
-                kill_data.append(player_kills)
-
-                player_xp = {"Player": player, "Team": team}
-                for skill in skills:
-                    xp = (
-                        data["data"]["skills"]
-                        .get(skill, {})
-                        .get("experience", {})
-                        .get("gained", 0)
-                    )
-                    player_xp[skill] = xp
-                    xp_team_totals[team][skill] += xp
-                xp_data.append(player_xp)
-            except KeyError:
-                print(f"Data issue for player {player}")
-        else:
-            print(f"Failed to fetch data for: {player}")
-        time.sleep(1)
-
-kill_player_df = pd.DataFrame(kill_data)
-xp_player_df = pd.DataFrame(xp_data)
-kill_team_df = pd.DataFrame.from_dict(kill_team_totals, orient="index")
-xp_team_df = pd.DataFrame.from_dict(xp_team_totals, orient="index")
-
-kill_player_df.to_csv("player_kill_data.csv", index=False)
-xp_player_df.to_csv("player_xp_data.csv", index=False)
-kill_team_df.to_csv("team_kill_totals.csv")
-xp_team_df.to_csv("team_xp_totals.csv")
-
-print("Kill and XP data saved to separate CSV files.")
+GAIN_COLUMNS = ["player", "team", "metric", "kind", "gained"]
+# Efficiency hours are fractional; every other metric counts kills or XP.
+FRACTIONAL_METRICS = {"ehp", "ehb"}
+
+
+def normalize_gains(gains, bosses, skills):
+    """Flatten raw ``/gained`` payloads into one row per player and metric."""
+    records = []
+    for (team, player), payload in gains.items():
+        if payload is None:
+            log.warning("Failed to fetch data for: %s", player)
+            continue
+        try:
+            boss_data = payload["data"]["bosses"]
+            skill_data = payload["data"]["skills"]
+        except KeyError:
+            log.warning("Data issue for player %s", player)
+            continue
+
+        records.extend(
+            (
+                player,
+                team,
+                boss,
+                "kills",
+                boss_data.get(boss, {}).get("kills", {}).get("gained", 0),
+            )
+            for boss in bosses
+        )
+        records.extend(
+            (
+                player,
+                team,
+                skill,
+                "xp",
+                skill_data.get(skill, {}).get("experience", {}).get("gained", 0),
+            )
+            for skill in skills
+        )
+
+    # The bot imports this module for its event settings, so only pay for
+    # pandas once gains are actually being tabulated.
+    import pandas as pd
+
+    return pd.DataFrame.from_records(records, columns=GAIN_COLUMNS)
+
+
+def player_table(gains_df, kind, metrics):
+    table = (
+        gains_df[gains_df["kind"] == kind]
+        .pivot_table(
+            index=["player", "team"],
+            columns="metric",
+            values="gained",
+            aggfunc="sum",
+            fill_value=0,
+            sort=False,
+        )
+        .reindex(columns=metrics, fill_value=0)
+        .reset_index()
+        .rename(columns={"player": "Player", "team": "Team"})
+    )
+    table.columns.name = None
+    return _whole_counts(table, metrics)
+
+
+def team_table(gains_df, kind, teams, metrics):
+    table = (
+        gains_df[gains_df["kind"] == kind]
+        .pivot_table(index="team", columns="metric", values="gained", aggfunc="sum")
+        .reindex(index=list(teams), columns=metrics, fill_value=0)
+        .fillna(0)
+        .rename_axis(index=None, columns=None)
+    )
+    return _whole_counts(table, metrics)
+
+
+def _whole_counts(table, metrics):
+    # All metrics share the "gained" column, so one fractional metric turns
+    # every kill and XP count into a float; put those back to integers.
+    counts = [metric for metric in metrics if metric not in FRACTIONAL_METRICS]
+    table[counts] = table[counts].astype("int64")
+    return table
+
+
+def team_summary(gains_df):
+    totals = (
+        gains_df.groupby(["kind", "metric", "team"], sort=False)["gained"]
+        .sum()
+        .rename("total")
+        .reset_index()
+    )
+    team_sizes = gains_df.groupby("team")["player"].nunique()
+    totals["per_capita"] = totals["total"] / totals["team"].map(team_sizes)
+    totals["rank"] = (
+        totals.groupby(["kind", "metric"])["total"]
+        .rank(ascending=False, method="min")
+        .astype(int)
+    )
+    return totals.sort_values(["kind", "metric", "rank"], ignore_index=True)
+
+
+def metric_leaders(gains_df):
+    gained = gains_df[gains_df["gained"] > 0]
+    leaders = gained.loc[gained.groupby(["kind", "metric"])["gained"].idxmax()]
+    return leaders[["kind", "metric", "player", "team", "gained"]].reset_index(
+        drop=True
+    )
+
+
+def build_tables(gains_df, teams, bosses, skills):
+    return {
+        "player_kill_data": player_table(gains_df, "kills", bosses),
+        "player_xp_data": player_table(gains_df, "xp", skills),
+        "team_kill_totals": team_table(gains_df, "kills", teams, bosses),
+        "team_xp_totals": team_table(gains_df, "xp", teams, skills),
+        "team_summary": team_summary(gains_df),
+        "metric_leaders": metric_leaders(gains_df),
+    }
+
+
+async def fetch_gains(
+    teams,
+    start_date,
+    end_date,
+    concurrency=5,
+    rate=20,
+    per=60.0,
+    cache=None,
+    ttl=3600,
+    offline=False,
+):
+    async with WiseOldManClient(
+        api_key=os.getenv("WOM_API_KEY"),
+        rate=rate,
+        per=per,
+        concurrency=concurrency,
+        cache=cache,
+        ttl=ttl,
+        offline=offline,
+    ) as client:
+        gains = await client.gains_for_teams(teams, start_date, end_date)
+        print(
+            "WOM requests: {fresh} cached, {revalidated} revalidated, "
+            "{fetched} fetched, {offline} missing offline".format(**client.stats)
+        )
+        return gains
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pull WiseOldMan gains for teams.")
+    parser.add_argument("--start-date", default=start_date)
+    parser.add_argument("--end-date", default=end_date)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument(
+        "--rate", type=int, default=20, help="Requests allowed per --per seconds"
+    )
+    parser.add_argument("--per", type=float, default=60.0)
+    parser.add_argument("--cache", default="wom_cache.sqlite3")
+    parser.add_argument(
+        "--ttl",
+        type=float,
+        default=3600,
+        help="Seconds before a cached player is refetched",
+    )
+    parser.add_argument(
+        "--offline", action="store_true", help="Only use cached responses"
+    )
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument(
+        "--snapshot-dir",
+        default="snapshots",
+        help="Parquet dataset each run is appended to",
+    )
+    parser.add_argument("--no-snapshot", action="store_true")
+    args = parser.parse_args()
+    # Per-player problems are logged; show them on the console like before.
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cache = None if args.no_cache else ResponseCache(args.cache)
+
+    gains = asyncio.run(
+        fetch_gains(
+            teams,
+            args.start_date,
+            args.end_date,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            per=args.per,
+            cache=cache,
+            ttl=args.ttl,
+            offline=args.offline,
+        )
+    )
+    if cache:
+        cache.close()
+    gains_df = normalize_gains(gains, bosses, skills)
+    tables = build_tables(gains_df, teams, bosses, skills)
+
+    tables["player_kill_data"].to_csv("player_kill_data.csv", index=False)
+    tables["player_xp_data"].to_csv("player_xp_data.csv", index=False)
+    tables["team_kill_totals"].to_csv("team_kill_totals.csv")
+    tables["team_xp_totals"].to_csv("team_xp_totals.csv")
+    tables["team_summary"].to_csv("team_summary.csv", index=False)
+    tables["metric_leaders"].to_csv("metric_leaders.csv", index=False)
+
+    print("Kill and XP data saved to separate CSV files.")
+
+    if not args.no_snapshot:
+        # The CSVs are already written, so a missing pyarrow only costs
+        # this run's history, not its output.
+        try:
+            from snapshots import write_snapshot
+        except ImportError as e:
+            print(f"Skipping snapshot, pyarrow is not installed: {e}")
+            return
+
+        taken_at = write_snapshot(gains_df, args.snapshot_dir)
+        print(
+            f"Snapshot {taken_at:%Y-%m-%d %H:%M:%S} UTC added to {args.snapshot_dir}."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+from executor import run_blocking
+
+log = logging.getLogger(__name__)
+
+_pool = None
+_slots = None
+_last_used = {}
+_health_check_interval = 30.0
+_usage_lock = threading.Lock()
+_usage = {"size": 0, "in_use": 0, "waiting": 0}
+
+
+def init_pool(dsn, minconn=1, maxconn=10, health_check_interval=30.0):
+    global _pool, _slots, _health_check_interval
+    if _pool is not None:
+        return _pool
+    _pool = ThreadedConnectionPool(minconn, maxconn, dsn, sslmode="require")
+    # ThreadedConnectionPool raises instead of waiting when exhausted, so
+    # callers queue on this semaphore for a free slot.
+    _slots = threading.BoundedSemaphore(maxconn)
+    _health_check_interval = health_check_interval
+    _usage["size"] = maxconn
+    log.info("Database pool ready (min=%s, max=%s)", minconn, maxconn)
+    return _pool
+
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+        _last_used.clear()
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0) < _health_check_interval:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    conn = _pool.getconn()
+    if not _is_healthy(conn):
+        log.warning("Discarding unhealthy pooled connection")
+        _last_used.pop(id(conn), None)
+        _pool.putconn(conn, close=True)
+        conn = _pool.getconn()
+    return conn
+
+
+@contextmanager
+def connection():
+    if _pool is None:
+        raise RuntimeError("Database pool has not been initialised.")
+    with _usage_lock:
+        _usage["waiting"] += 1
+    _slots.acquire()
+    with _usage_lock:
+        _usage["waiting"] -= 1
+        _usage["in_use"] += 1
+    conn = None
+    broken = False
+    try:
+        conn = _checkout()
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        if conn is not None:
+            if broken or conn.closed:
+                _last_used.pop(id(conn), None)
+                _pool.putconn(conn, close=True)
+            else:
+                _last_used[id(conn)] = time.monotonic()
+                _pool.putconn(conn)
+        with _usage_lock:
+            _usage["in_use"] -= 1
+        _slots.release()
+
+
+def pool_stats():
+    """Snapshot of pool size, connections checked out and callers queued."""
+    with _usage_lock:
+        return dict(_usage)
+
+
+@contextmanager
+def transaction():
+    with connection() as conn:
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        try:
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+def _run_sync(fn, *args):
+    with transaction() as cursor:
+        return fn(cursor, *args)
+
+
+async def run(fn, *args):
+    """Run ``fn(cursor, *args)`` in one transaction without blocking the loop."""
+    return await run_blocking(_run_sync, fn, *args)
+
+
+async def execute(query, params=None):
+    def _execute(cursor):
+        cursor.execute(query, params)
+        return cursor.rowcount
+
+    return await run(_execute)
+
+
+async def fetchone(query, params=None):
+    def _fetchone(cursor):
+        cursor.execute(query, params)
+        return cursor.fetchone()
+
+    return await run(_fetchone)
+
+
+async def fetchall(query, params=None):
+    def _fetchall(cursor):
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    return await run(_fetchall)
+
+
+@contextmanager
+def server_cursor(name, itersize=1000):
+    """Named cursor that streams rows from Postgres ``itersize`` at a time."""
+    with connection() as conn:
+        cursor = conn.cursor(name=name, cursor_factory=DictCursor)
+        cursor.itersize = itersize
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            conn.rollback()
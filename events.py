@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+import db
+
+log = logging.getLogger(__name__)
+
+EVENT_COLUMNS = (
+    "guild_id",
+    "drop_id",
+    "event_type",
+    "actor_id",
+    "team_role",
+    "category",
+    "old_status",
+    "new_status",
+    "comment",
+    "created_at",
+)
+REVIEW_EVENTS = {"Confirmed": "confirm", "Rejected": "reject"}
+
+
+def insert_events(cursor, rows):
+    execute_values(
+        cursor,
+        f"INSERT INTO drop_events ({', '.join(EVENT_COLUMNS)}) VALUES %s;",
+        rows,
+    )
+
+
+class EventWriter:
+    """Appends rows to ``drop_events`` in batches off the command path.
+
+    Commands call ``record`` and carry on; a background worker groups
+    whatever arrives within ``flush_interval`` into a single INSERT.
+    Events are timestamped when recorded, not when written, so batching
+    never reorders a drop's history.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue()
+        self.written = 0
+        self.failures = 0
+        # Rows the worker has taken off the queue but not written yet; kept
+        # here rather than in a local so ``flush`` writes them too.
+        self._batch = []
+        self._retry = []
+        self._lock = asyncio.Lock()
+        self._worker = None
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def record(
+        self,
+        event_type,
+        guild_id,
+        drop_id=None,
+        actor_id=None,
+        team_role=None,
+        category=None,
+        old_status=None,
+        new_status=None,
+        comment=None,
+    ):
+        self.queue.put_nowait(
+            (
+                guild_id,
+                drop_id,
+                event_type,
+                actor_id,
+                team_role,
+                category,
+                old_status,
+                new_status,
+                comment,
+                datetime.utcnow(),
+            )
+        )
+
+    def record_review(self, drop_data, actor_id, comment=None):
+        self.record(
+            REVIEW_EVENTS[drop_data["status"]],
+            drop_data["guild_id"],
+            drop_id=drop_data["drop_id"],
+            actor_id=actor_id,
+            team_role=drop_data["team_role"],
+            category=drop_data["category"],
+            old_status=drop_data["previous_status"],
+            new_status=drop_data["status"],
+            comment=comment,
+        )
+
+    def pending(self):
+        return self.queue.qsize() + len(self._batch) + len(self._retry)
+
+    def _drain(self, limit=None):
+        rows = []
+        while not self.queue.empty() and (limit is None or len(rows) < limit):
+            rows.append(self.queue.get_nowait())
+        return rows
+
+    async def _write(self, rows=()):
+        async with self._lock:
+            rows = self._retry + self._batch + list(rows)
+            self._retry = []
+            self._batch = []
+            if not rows:
+                return
+            try:
+                await db.run(insert_events, rows)
+                self.written += len(rows)
+            except Exception:
+                # Keep the batch and try again with the next one.
+                self.failures += 1
+                self._retry = rows
+                log.exception("Failed to write %d drop events", len(rows))
+
+    async def flush(self):
+        """Write everything recorded so far, e.g. before reading the rollups."""
+        await self._write(self._drain())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self.queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                self._batch.extend(self._drain(self.batch_size - len(self._batch)))
+                remaining = deadline - loop.time()
+                if len(self._batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._batch.append(row)
+            # A flush in the meantime may already have written the batch.
+            await self._write()
+
+    def close(self):
+        """Synchronously write any leftovers once the event loop has stopped."""
+        rows = self._retry + self._batch + self._drain()
+        self._retry = []
+        self._batch = []
+        if rows:
+            with db.transaction() as cursor:
+                insert_events(cursor, rows)
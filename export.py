@@ -0,0 +1,114 @@
+import csv
+import gzip
+import io
+import json
+import textwrap
+
+import db
+
+FORMATS = ("json", "ndjson", "csv")
+FIELDS = [
+    "drop_id",
+    "submitter_id",
+    "team_role",
+    "category",
+    "image_url",
+    "image_key",
+    "status",
+    "timestamp",
+]
+
+# Headroom for bytes still sitting in the text/gzip buffers when a part's
+# size is checked.
+PART_MARGIN = 1024 * 1024
+
+
+def _record(row):
+    return {
+        "drop_id": f"DROP-{row['drop_id']}",
+        "submitter_id": row["submitter_id"],
+        "team_role": row["team_role"],
+        "category": row["category"],
+        "image_url": row["image_url"],
+        "image_key": row["image_key"],
+        "status": row["status"],
+        "timestamp": row["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+class _ExportPart:
+    def __init__(self, fmt, compress):
+        self.fmt = fmt
+        self.count = 0
+        self.buffer = io.BytesIO()
+        self.gzip = gzip.GzipFile(fileobj=self.buffer, mode="wb") if compress else None
+        self.text = io.TextIOWrapper(
+            self.gzip or self.buffer, encoding="utf-8", newline=""
+        )
+
+        if fmt == "csv":
+            self.writer = csv.DictWriter(self.text, fieldnames=FIELDS)
+            self.writer.writeheader()
+        elif fmt == "json":
+            self.text.write("[")
+
+    def write(self, record):
+        if self.fmt == "csv":
+            self.writer.writerow(record)
+        elif self.fmt == "ndjson":
+            self.text.write(json.dumps(record) + "\n")
+        else:
+            separator = "," if self.count else ""
+            self.text.write(
+                separator + "\n" + textwrap.indent(json.dumps(record, indent=4), "    ")
+            )
+        self.count += 1
+
+    def size(self):
+        return self.buffer.tell()
+
+    def close(self):
+        if self.fmt == "json":
+            self.text.write("\n]\n")
+        self.text.flush()
+        self.text.detach()
+        if self.gzip:
+            self.gzip.close()
+        self.buffer.seek(0)
+        return self.buffer
+
+
+def export_drops(clauses, params, fmt="json", compress=False, max_bytes=None):
+    """Stream matching drops into one or more in-memory export files.
+
+    Returns a list of ``(filename, buffer)`` pairs; a new part is started
+    whenever the current one reaches ``max_bytes``.
+    """
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    limit = max(max_bytes - PART_MARGIN, PART_MARGIN) if max_bytes else None
+
+    parts = []
+    part = None
+    with db.server_cursor("drops_export") as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(FIELDS)} FROM drops {where} ORDER BY drop_id;",
+            params,
+        )
+        for row in cursor:
+            if part is None:
+                part = _ExportPart(fmt, compress)
+            part.write(_record(row))
+            if limit and part.size() >= limit:
+                parts.append(part.close())
+                part = None
+
+    if part is not None:
+        parts.append(part.close())
+
+    extension = fmt + (".gz" if compress else "")
+    if len(parts) == 1:
+        return [(f"drop_data.{extension}", parts[0])]
+    return [
+        (f"drop_data-part{i}.{extension}", buffer)
+        for i, buffer in enumerate(parts, start=1)
+    ]
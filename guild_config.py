@@ -0,0 +1,99 @@
+class GuildConfig:
+    """One guild's bingo event: its teams, captains, categories and owner."""
+
+    def __init__(self, guild_id, teams, captains, categories, owner_id=None):
+        self.guild_id = guild_id
+        self.teams = list(teams)
+        self.captains = list(captains)
+        self.categories = list(categories)
+        self.owner_id = owner_id
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            row["guild_id"],
+            row["teams"],
+            row["captains"],
+            row["categories"],
+            row["owner_id"],
+        )
+
+    def replace(self, **changes):
+        fields = {
+            "guild_id": self.guild_id,
+            "teams": self.teams,
+            "captains": self.captains,
+            "categories": self.categories,
+            "owner_id": self.owner_id,
+        }
+        fields.update(changes)
+        return GuildConfig(**fields)
+
+    def is_owner(self, user_id, guild_owner_id=None):
+        # Without a configured owner the event belongs to whoever owns the guild.
+        return user_id == (self.owner_id or guild_owner_id)
+
+
+def save_config(cursor, config):
+    cursor.execute(
+        """
+        INSERT INTO guild_config (guild_id, owner_id, teams, captains, categories)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (guild_id) DO UPDATE SET
+            owner_id = EXCLUDED.owner_id,
+            teams = EXCLUDED.teams,
+            captains = EXCLUDED.captains,
+            categories = EXCLUDED.categories,
+            updated_at = CURRENT_TIMESTAMP;
+        """,
+        (
+            config.guild_id,
+            config.owner_id,
+            config.teams,
+            config.captains,
+            config.categories,
+        ),
+    )
+
+
+def claim_legacy_rows(cursor, config):
+    """Move rows from before multi-guild support (guild 0) onto ``config``'s guild."""
+    for table in ("drops", "drop_events", "team_progress"):
+        cursor.execute(
+            f"UPDATE {table} SET guild_id = %s WHERE guild_id = 0;",
+            (config.guild_id,),
+        )
+    cursor.execute(
+        "SELECT 1 FROM guild_config WHERE guild_id = %s;", (config.guild_id,)
+    )
+    if cursor.fetchone() is None:
+        save_config(cursor, config)
+
+
+class GuildConfigs:
+    """Every guild's config, read once at startup and served from memory.
+
+    Guilds without a row fall back to ``default``, which keeps a fresh
+    install behaving like the original single-event bot.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self._configs = {}
+
+    def load(self, cursor):
+        cursor.execute(
+            "SELECT guild_id, owner_id, teams, captains, categories FROM guild_config;"
+        )
+        self._configs = {
+            row["guild_id"]: GuildConfig.from_row(row) for row in cursor.fetchall()
+        }
+
+    def set(self, config):
+        self._configs[config.guild_id] = config
+
+    def __getitem__(self, guild_id):
+        config = self._configs.get(guild_id)
+        if config is None:
+            return self.default.replace(guild_id=guild_id)
+        return config
@@ -0,0 +1,59 @@
+class GuildIndex:
+    """Name and ID lookup tables for one guild's text channels and roles."""
+
+    def __init__(self, guild, team_names):
+        self.channels = {}
+        for channel in guild.text_channels:
+            # Keep the first match, as discord.utils.get would.
+            self.channels.setdefault(channel.name, channel)
+
+        self.roles = {}
+        self.team_by_role_id = {}
+        self.role_by_team = {}
+        for role in guild.roles:
+            name = role.name.lower()
+            self.roles.setdefault(name, role)
+            if name in team_names:
+                self.team_by_role_id[role.id] = name
+                self.role_by_team.setdefault(name, role)
+
+    def channel(self, name):
+        return self.channels.get(name)
+
+    def team_channel(self, team):
+        return self.channels.get(team.replace(" ", "-"))
+
+    def role(self, name):
+        return self.roles.get(name.lower())
+
+    def team_for_member(self, member):
+        return next(
+            (
+                self.team_by_role_id[role.id]
+                for role in member.roles
+                if role.id in self.team_by_role_id
+            ),
+            None,
+        )
+
+
+class GuildIndexes:
+    """Per-guild GuildIndex objects, rebuilt whenever a channel or role changes."""
+
+    def __init__(self, guild_configs):
+        self.guild_configs = guild_configs
+        self._indexes = {}
+
+    def rebuild(self, guild):
+        team_names = set(self.guild_configs[guild.id].teams)
+        self._indexes[guild.id] = GuildIndex(guild, team_names)
+
+    def discard(self, guild):
+        self._indexes.pop(guild.id, None)
+
+    def __getitem__(self, guild):
+        index = self._indexes.get(guild.id)
+        if index is None:
+            self.rebuild(guild)
+            index = self._indexes[guild.id]
+        return index
@@ -0,0 +1,150 @@
+import io
+import ipaddress
+from urllib.parse import urlsplit
+
+from aiohttp.resolver import DefaultResolver
+
+HASH_BITS = 64
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+class UnsafeImageURL(Exception):
+    pass
+
+
+class NotAnImage(Exception):
+    pass
+
+
+def dhash(data, size=8):
+    """64-bit difference hash: one bit per adjacent-pixel brightness step."""
+    # Pillow is only needed once the first image arrives, not at startup.
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("L", (size * 4, size * 4))
+        pixels = list(
+            image.convert("L").resize((size + 1, size), Image.LANCZOS).getdata()
+        )
+
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def to_signed(value):
+    """Fit an unsigned 64-bit hash into a Postgres BIGINT."""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value & ((1 << HASH_BITS) - 1)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Metric tree over Hamming distance for near-duplicate hash lookups."""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = (value, item, {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, item, {})
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """Return ``(distance, item)`` pairs within ``max_distance``, nearest first."""
+        matches = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_value, item, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                matches.append((distance, item))
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(
+                child for d, child in children.items() if low <= d <= high
+            )
+        return sorted(matches, key=lambda match: match[0])
+
+    def clear(self):
+        self.root = None
+        self.size = 0
+
+
+def _is_public(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global
+
+
+def check_image_url(url):
+    """Only fetch http(s) URLs; literal addresses must be public."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsafeImageURL(url)
+    try:
+        ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        # A hostname; PublicResolver checks whatever it resolves to.
+        return
+    if not _is_public(parts.hostname):
+        raise UnsafeImageURL(url)
+
+
+class PublicResolver(DefaultResolver):
+    """Refuses hostnames that resolve to private, loopback or link-local addresses.
+
+    Checking at connect time, rather than before the request, means a
+    name can't be re-pointed at an internal address in between.
+    """
+
+    async def resolve(self, host, *args, **kwargs):
+        results = await super().resolve(host, *args, **kwargs)
+        if not all(_is_public(result["host"]) for result in results):
+            raise OSError(f"{host} resolves to a non-public address")
+        return results
+
+
+async def download(session, url, max_bytes):
+    check_image_url(url)
+    # Redirects could lead anywhere, so they are refused rather than followed.
+    async with session.get(url, allow_redirects=False) as response:
+        response.raise_for_status()
+        if response.status != 200:
+            raise UnsafeImageURL(f"{url} answered HTTP {response.status}")
+        if not response.content_type.startswith("image/"):
+            raise NotAnImage(response.content_type)
+        if response.content_length and response.content_length > max_bytes:
+            raise ImageTooLarge(response.content_length)
+        buffer = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            buffer.extend(chunk)
+            if len(buffer) > max_bytes:
+                raise ImageTooLarge(len(buffer))
+        return bytes(buffer)
@@ -0,0 +1,210 @@
+import logging
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# StepTimer labels grouped into the three places a command spends time.
+STAGES = {
+    "db": "db",
+    "image": "rest",
+    "notify": "rest",
+    "defer": "response",
+    "followup": "response",
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(name, labels, label_values, value):
+    if labels:
+        pairs = ",".join(
+            f'{label}="{_escape(v)}"' for label, v in zip(labels, label_values)
+        )
+        name = f"{name}{{{pairs}}}"
+    return f"{name} {float(value):g}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = defaultdict(float)
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] += amount
+
+    def lines(self):
+        for label_values, value in sorted(self.values.items()):
+            yield _format(self.name, self.labels, label_values, value)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., +Inf count, sum]
+        self.values = {}
+
+    def observe(self, value, *label_values):
+        series = self.values.setdefault(label_values, [0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def count(self, *label_values):
+        series = self.values.get(label_values)
+        return series[-2] if series else 0
+
+    def quantile(self, q, *label_values):
+        """Upper bound of the bucket holding the ``q`` quantile, or None."""
+        series = self.values.get(label_values)
+        if not series or not series[-2]:
+            return None
+        target = q * series[-2]
+        for bound, cumulative in zip(self.buckets, series):
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+    def lines(self):
+        labels = self.labels + ("le",)
+        for label_values, series in sorted(self.values.items()):
+            for bound, cumulative in zip(self.buckets, series):
+                yield _format(
+                    f"{self.name}_bucket", labels, label_values + (bound,), cumulative
+                )
+            yield _format(
+                f"{self.name}_bucket", labels, label_values + ("+Inf",), series[-2]
+            )
+            yield _format(f"{self.name}_count", self.labels, label_values, series[-2])
+            yield _format(f"{self.name}_sum", self.labels, label_values, series[-1])
+
+
+class Gauge:
+    """Read at scrape time from ``fn``, which returns a number or a dict of
+    label-value tuples to numbers.
+
+    Pass ``kind="counter"`` to expose a running total that some other
+    object already keeps, such as a client's retry statistics.
+    """
+
+    def __init__(self, name, help, fn, labels=(), kind="gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+        self.kind = kind
+
+    def read(self):
+        value = self.fn()
+        return value if isinstance(value, dict) else {(): value}
+
+    def lines(self):
+        for label_values, value in sorted(self.read().items()):
+            if value is not None:
+                yield _format(self.name, self.labels, label_values, value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn, labels=(), kind="gauge"):
+        return self.register(Gauge(name, help, fn, labels, kind))
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            try:
+                body = list(metric.lines())
+            except Exception:
+                log.exception("Could not read metric %s", metric.name)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(body)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+command_calls = registry.counter(
+    "bingo_command_calls_total", "Slash commands invoked.", ("command",)
+)
+command_errors = registry.counter(
+    "bingo_command_errors_total", "Slash commands that raised.", ("command", "error")
+)
+command_seconds = registry.histogram(
+    "bingo_command_seconds", "End-to-end slash command latency.", ("command",)
+)
+stage_seconds = registry.histogram(
+    "bingo_command_stage_seconds",
+    "Time spent per command stage (db, rest or response).",
+    ("command", "stage"),
+)
+
+
+def observe_command(command, elapsed, error=None):
+    command_calls.inc(command)
+    command_seconds.observe(elapsed, command)
+    if error is not None:
+        command_errors.inc(command, type(error).__name__)
+
+
+def observe_steps(command, steps):
+    for label, elapsed in steps:
+        stage_seconds.observe(elapsed, command, STAGES.get(label, label))
+
+
+class RateLimitCounter(logging.Handler):
+    """Counts discord.py's "being rate limited" warnings as 429 hits."""
+
+    def __init__(self, level=logging.WARNING):
+        super().__init__(level)
+        self.hits = 0
+
+    def emit(self, record):
+        if "rate limit" in record.getMessage().lower():
+            self.hits += 1
+
+
+async def serve(host, port):
+    """Expose ``registry`` at ``http://host:port/metrics``; returns the runner."""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(
+            text=registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return runner
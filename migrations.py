@@ -0,0 +1,252 @@
+import logging
+
+import db
+
+log = logging.getLogger(__name__)
+
+# Append new migrations to the end; never edit one that has shipped.
+MIGRATIONS = [
+    (
+        1,
+        "create drops table",
+        """
+        CREATE TABLE IF NOT EXISTS drops (
+            drop_id SERIAL PRIMARY KEY,
+            submitter_id BIGINT,
+            team_role TEXT,
+            category TEXT,
+            image_url TEXT,
+            status TEXT DEFAULT 'Pending',
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE drops ADD COLUMN IF NOT EXISTS category TEXT;
+        ALTER TABLE drops ADD COLUMN IF NOT EXISTS progress TEXT DEFAULT NULL;
+        """,
+    ),
+    (
+        2,
+        "record review message ids",
+        """
+        ALTER TABLE drops ADD COLUMN IF NOT EXISTS staff_message_id BIGINT;
+        ALTER TABLE drops ADD COLUMN IF NOT EXISTS team_message_id BIGINT;
+        """,
+    ),
+    (
+        3,
+        "index drops by team, category and status",
+        """
+        CREATE INDEX IF NOT EXISTS drops_team_category_status_idx
+            ON drops (team_role, category, status);
+        CREATE INDEX IF NOT EXISTS drops_status_timestamp_idx
+            ON drops (status, timestamp);
+        """,
+    ),
+    (
+        4,
+        "move progress into team_progress",
+        """
+        CREATE TABLE IF NOT EXISTS team_progress (
+            team_role TEXT NOT NULL,
+            category TEXT NOT NULL,
+            progress TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (team_role, category)
+        );
+        INSERT INTO team_progress (team_role, category, progress)
+        SELECT DISTINCT ON (team_role, category) team_role, category, progress
+        FROM drops
+        WHERE progress IS NOT NULL AND category IS NOT NULL
+        ORDER BY team_role, category, drop_id DESC
+        ON CONFLICT (team_role, category) DO NOTHING;
+        """,
+    ),
+    (
+        5,
+        "index the pending review queue",
+        """
+        CREATE INDEX IF NOT EXISTS drops_pending_queue_idx
+            ON drops (timestamp, drop_id)
+            WHERE status = 'Pending';
+        """,
+    ),
+    (
+        6,
+        "store perceptual image hashes",
+        """
+        ALTER TABLE drops ADD COLUMN IF NOT EXISTS image_hash BIGINT;
+        CREATE INDEX IF NOT EXISTS drops_image_hash_idx
+            ON drops (image_hash)
+            WHERE image_hash IS NOT NULL;
+        """,
+    ),
+    (
+        7,
+        "reference stored image attachments",
+        """
+        ALTER TABLE drops ADD COLUMN IF NOT EXISTS image_key TEXT;
+        """,
+    ),
+    (
+        8,
+        "audit drop events and roll them up into the board",
+        """
+        CREATE TABLE IF NOT EXISTS drop_events (
+            event_id BIGSERIAL PRIMARY KEY,
+            drop_id INTEGER,
+            event_type TEXT NOT NULL,
+            actor_id BIGINT,
+            team_role TEXT,
+            category TEXT,
+            old_status TEXT,
+            new_status TEXT,
+            comment TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS drop_events_drop_idx
+            ON drop_events (drop_id, created_at, event_id);
+
+        -- History before this migration is unknown, so reconstruct the
+        -- minimum: every drop was submitted, and reviewed ones moved once.
+        INSERT INTO drop_events
+            (drop_id, event_type, actor_id, team_role, category, new_status, created_at)
+        SELECT drop_id, 'submit', submitter_id, team_role, category, 'Pending',
+               COALESCE(timestamp, CURRENT_TIMESTAMP)
+        FROM drops;
+        INSERT INTO drop_events
+            (drop_id, event_type, team_role, category, old_status, new_status,
+             comment, created_at)
+        SELECT drop_id,
+               CASE status WHEN 'Confirmed' THEN 'confirm' ELSE 'reject' END,
+               team_role, category, 'Pending', status, 'backfilled',
+               COALESCE(timestamp, CURRENT_TIMESTAMP)
+        FROM drops
+        WHERE status IS DISTINCT FROM 'Pending';
+        INSERT INTO drop_events
+            (event_type, team_role, category, comment, created_at)
+        SELECT 'progress', team_role, category, progress,
+               COALESCE(updated_at, CURRENT_TIMESTAMP)
+        FROM team_progress;
+
+        CREATE OR REPLACE VIEW drop_current_status AS
+        SELECT DISTINCT ON (drop_id)
+               drop_id, team_role, category, new_status AS status,
+               created_at AS changed_at
+        FROM drop_events
+        WHERE drop_id IS NOT NULL AND new_status IS NOT NULL
+        ORDER BY drop_id, created_at DESC, event_id DESC;
+
+        CREATE MATERIALIZED VIEW IF NOT EXISTS drop_board AS
+        SELECT team_role, category, status, COUNT(*) AS count
+        FROM drop_current_status
+        WHERE category IS NOT NULL
+        GROUP BY team_role, category, status;
+        CREATE UNIQUE INDEX IF NOT EXISTS drop_board_key
+            ON drop_board (team_role, category, status);
+        """,
+    ),
+    (
+        9,
+        "scope drops and the board to a guild",
+        """
+        CREATE TABLE IF NOT EXISTS guild_config (
+            guild_id BIGINT PRIMARY KEY,
+            owner_id BIGINT,
+            teams TEXT[] NOT NULL,
+            captains TEXT[] NOT NULL DEFAULT '{}',
+            categories TEXT[] NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Existing rows belong to whichever guild the bot used to serve.
+        -- They sit under guild 0 until LEGACY_GUILD_ID claims them.
+        ALTER TABLE drops ADD COLUMN IF NOT EXISTS guild_id BIGINT NOT NULL DEFAULT 0;
+        ALTER TABLE drops ALTER COLUMN guild_id DROP DEFAULT;
+        ALTER TABLE drop_events
+            ADD COLUMN IF NOT EXISTS guild_id BIGINT NOT NULL DEFAULT 0;
+        ALTER TABLE drop_events ALTER COLUMN guild_id DROP DEFAULT;
+        ALTER TABLE team_progress
+            ADD COLUMN IF NOT EXISTS guild_id BIGINT NOT NULL DEFAULT 0;
+        ALTER TABLE team_progress ALTER COLUMN guild_id DROP DEFAULT;
+        ALTER TABLE team_progress DROP CONSTRAINT IF EXISTS team_progress_pkey;
+        ALTER TABLE team_progress ADD PRIMARY KEY (guild_id, team_role, category);
+
+        DROP INDEX IF EXISTS drops_team_category_status_idx;
+        DROP INDEX IF EXISTS drops_status_timestamp_idx;
+        DROP INDEX IF EXISTS drops_pending_queue_idx;
+        DROP INDEX IF EXISTS drop_events_drop_idx;
+        CREATE INDEX IF NOT EXISTS drops_guild_team_category_status_idx
+            ON drops (guild_id, team_role, category, status);
+        CREATE INDEX IF NOT EXISTS drops_guild_status_timestamp_idx
+            ON drops (guild_id, status, timestamp);
+        CREATE INDEX IF NOT EXISTS drops_guild_pending_queue_idx
+            ON drops (guild_id, timestamp, drop_id)
+            WHERE status = 'Pending';
+        CREATE INDEX IF NOT EXISTS drops_guild_drop_idx
+            ON drops (guild_id, drop_id);
+        CREATE INDEX IF NOT EXISTS drop_events_guild_drop_idx
+            ON drop_events (guild_id, drop_id, created_at, event_id);
+
+        DROP MATERIALIZED VIEW IF EXISTS drop_board;
+        DROP VIEW IF EXISTS drop_current_status;
+        CREATE VIEW drop_current_status AS
+        SELECT DISTINCT ON (drop_id)
+               guild_id, drop_id, team_role, category, new_status AS status,
+               created_at AS changed_at
+        FROM drop_events
+        WHERE drop_id IS NOT NULL AND new_status IS NOT NULL
+        ORDER BY drop_id, created_at DESC, event_id DESC;
+
+        CREATE MATERIALIZED VIEW drop_board AS
+        SELECT guild_id, team_role, category, status, COUNT(*) AS count
+        FROM drop_current_status
+        WHERE category IS NOT NULL
+        GROUP BY guild_id, team_role, category, status;
+        CREATE UNIQUE INDEX drop_board_key
+            ON drop_board (guild_id, team_role, category, status);
+        """,
+    ),
+    (
+        10,
+        "remember bot state between restarts",
+        """
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+    ),
+]
+
+# Arbitrary key so two dynos booting together don't race each other.
+MIGRATION_LOCK_ID = 727_001
+
+
+def _apply(cursor):
+    cursor.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    cursor.execute("SELECT version FROM schema_migrations;")
+    applied = {row["version"] for row in cursor.fetchall()}
+
+    pending = [m for m in MIGRATIONS if m[0] not in applied]
+    for version, name, sql in pending:
+        log.info("Applying migration %s: %s", version, name)
+        cursor.execute(sql)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);",
+            (version, name),
+        )
+    return [version for version, _, _ in pending]
+
+
+def migrate():
+    with db.transaction() as cursor:
+        return _apply(cursor)
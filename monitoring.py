@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed-interval sleep.
+
+    Any lateness is time the loop spent running something else without
+    yielding, so a lag spike is attributed to whichever commands were in
+    flight when it happened.
+    """
+
+    def __init__(self, interval=0.5, warn_after=0.25):
+        self.interval = interval
+        self.warn_after = warn_after
+        self.active = {}
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._task = None
+
+    def begin(self, interaction):
+        name = interaction.command.qualified_name if interaction.command else "?"
+        self.active[interaction.id] = (name, time.monotonic())
+
+    def end(self, interaction):
+        """Stop tracking ``interaction``; returns its ``(name, started)`` or None."""
+        return self.active.pop(interaction.id, None)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.warn_after:
+                self.stalls += 1
+                log.warning(
+                    "Event loop blocked for %.0f ms; running: %s",
+                    lag * 1000,
+                    ", ".join(self._describe_active()) or "no commands",
+                )
+            self._prune()
+
+    def _describe_active(self):
+        now = time.monotonic()
+        return [
+            f"/{name} ({(now - started) * 1000:.0f} ms)"
+            for name, started in self.active.values()
+        ]
+
+    def _prune(self, max_age=900):
+        # Interactions that never reach completion or error hooks.
+        cutoff = time.monotonic() - max_age
+        for key, (_, started) in list(self.active.items()):
+            if started < cutoff:
+                del self.active[key]
+
+
+class StepTimer:
+    """Wall-clock timings for the stages of a single command invocation."""
+
+    def __init__(self, name, prefix="/"):
+        self.name = name
+        self.prefix = prefix
+        self.started = time.perf_counter()
+        self.steps = []
+
+    @contextmanager
+    def step(self, label):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((label, time.perf_counter() - started))
+
+    def log(self, detail=""):
+        total = time.perf_counter() - self.started
+        metrics.observe_steps(self.name, self.steps)
+        log.info(
+            "%s%s%s took %.0f ms (%s)",
+            self.prefix,
+            self.name,
+            f" {detail}" if detail else "",
+            total * 1000,
+            ", ".join(
+                f"{label}={elapsed * 1000:.0f}ms" for label, elapsed in self.steps
+            ),
+        )
@@ -0,0 +1,238 @@
+import asyncio
+import io
+import logging
+
+import discord
+
+from rate_limit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+MAX_EMBEDS = 10
+MAX_CONTENT = 2000
+# discord.py's per-tier upload limits can trail Discord's own, so merged
+# uploads never exceed the unboosted limit either.
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+RATE_LIMIT_RETRIES = 3
+
+
+class _Send:
+    def __init__(self, future, content, embeds, files, coalesce):
+        self.future = future
+        self.content = content
+        self.embeds = embeds
+        self.files = files
+        self.coalesce = coalesce
+
+
+class _React:
+    def __init__(self, future, emoji):
+        self.future = future
+        self.emoji = emoji
+
+
+class _Channel:
+    def __init__(self, send_rate, send_per, react_rate, react_per):
+        self.queue = asyncio.Queue()
+        self.sends = TokenBucket(send_rate, send_per)
+        self.reactions = TokenBucket(react_rate, react_per)
+        self.worker = None
+
+
+class Dispatcher:
+    """Queues every outbound message and reaction, one worker per channel.
+
+    Discord rate limits messages and reactions per channel, so each channel
+    drains its own queue through its own token buckets and a burst in one
+    team channel never holds up another. Sends marked ``coalesce`` that
+    arrive within ``window`` seconds of each other are merged into a single
+    multi-embed message.
+
+    ``send`` and ``react`` return futures that resolve to the sent message
+    (or None on failure); callers that don't need the result can drop them.
+    """
+
+    def __init__(
+        self,
+        send_rate=5,
+        send_per=5.0,
+        react_rate=1,
+        react_per=0.3,
+        window=1.5,
+        idle_timeout=60.0,
+    ):
+        self.send_rate = send_rate
+        self.send_per = send_per
+        self.react_rate = react_rate
+        self.react_per = react_per
+        self.window = window
+        self.idle_timeout = idle_timeout
+        self.rate_limited = 0
+        self.coalesced = 0
+        self._channels = {}
+        self._tasks = set()
+
+    def _enqueue(self, channel_id, target, job):
+        state = self._channels.get(channel_id)
+        if state is None:
+            state = self._channels[channel_id] = _Channel(
+                self.send_rate, self.send_per, self.react_rate, self.react_per
+            )
+        state.queue.put_nowait((target, job))
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.get_running_loop().create_task(
+                self._run(channel_id, state)
+            )
+        return job.future
+
+    def send(self, channel, content=None, embed=None, file=None, coalesce=False):
+        future = asyncio.get_running_loop().create_future()
+        job = _Send(
+            future,
+            content,
+            [embed] if embed else [],
+            [file] if file else [],
+            coalesce,
+        )
+        return self._enqueue(channel.id, channel, job)
+
+    def react(self, message, emoji):
+        future = asyncio.get_running_loop().create_future()
+        job = _React(future, emoji)
+        return self._enqueue(message.channel.id, message, job)
+
+    def spawn(self, coro):
+        """Run ``coro`` in the background, keeping a reference until it ends."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def pending(self):
+        return sum(state.queue.qsize() for state in self._channels.values())
+
+    async def _run(self, channel_id, state):
+        held = None
+        while True:
+            if held is not None:
+                target, job = held
+                held = None
+            else:
+                try:
+                    target, job = await asyncio.wait_for(
+                        state.queue.get(), self.idle_timeout
+                    )
+                except asyncio.TimeoutError:
+                    if state.queue.empty():
+                        self._channels.pop(channel_id, None)
+                        return
+                    continue
+
+            if isinstance(job, _React):
+                await self._deliver(
+                    state.reactions, [job], lambda: target.add_reaction(job.emoji)
+                )
+                continue
+
+            jobs = [job]
+            if job.coalesce:
+                held = await self._gather(state, target, jobs)
+            await self._deliver(state.sends, jobs, lambda: self._send(target, jobs))
+
+    async def _gather(self, state, channel, jobs):
+        """Pull further coalescable sends into ``jobs`` until the window closes.
+
+        Returns the first queued item that could not be merged, if any.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                item = await asyncio.wait_for(state.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            job = item[1]
+            mergeable = isinstance(job, _Send) and job.coalesce
+            if not (mergeable and self._fits(channel, jobs, job)):
+                return item
+            jobs.append(job)
+
+    def _fits(self, channel, jobs, job):
+        merged = jobs + [job]
+        files = _unique_files(merged)
+        embeds = sum(len(j.embeds) for j in merged)
+        content = len(_merge_content(merged) or "")
+        guild = getattr(channel, "guild", None)
+        upload_limit = min(
+            getattr(guild, "filesize_limit", MAX_UPLOAD_BYTES), MAX_UPLOAD_BYTES
+        )
+        return (
+            embeds <= MAX_EMBEDS
+            and len(files) <= MAX_EMBEDS
+            and content <= MAX_CONTENT
+            and sum(_file_size(file) for file in files) <= upload_limit
+        )
+
+    async def _send(self, channel, jobs):
+        files = _unique_files(jobs)
+        for file in files:
+            # Rewind in case an earlier attempt already read the file.
+            file.reset()
+        kwargs = {"content": _merge_content(jobs)}
+        embeds = [embed for job in jobs for embed in job.embeds]
+        if embeds:
+            kwargs["embeds"] = embeds
+        if files:
+            kwargs["files"] = files
+        message = await channel.send(**kwargs)
+        if len(jobs) > 1:
+            self.coalesced += len(jobs) - 1
+        return message
+
+    async def _deliver(self, bucket, jobs, call):
+        """Make ``call()`` once a token is free, retrying it after a 429."""
+        result = None
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await bucket.acquire()
+            try:
+                result = await call()
+                break
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    self.rate_limited += 1
+                    bucket.block_for(getattr(e, "retry_after", None) or 1.0)
+                    if attempt < RATE_LIMIT_RETRIES:
+                        continue
+                log.warning("Outbound Discord call failed: %s", e)
+                break
+            except Exception:
+                log.exception("Outbound Discord call failed")
+                break
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_result(result)
+
+
+def _merge_content(jobs):
+    lines = list(dict.fromkeys(job.content for job in jobs if job.content))
+    return "\n".join(lines) or None
+
+
+def _unique_files(jobs):
+    files = {}
+    for job in jobs:
+        for file in job.files:
+            # Several drops can share one stored image.
+            files.setdefault(file.filename, file)
+    return list(files.values())
+
+
+def _file_size(file):
+    fp = file.fp
+    position = fp.tell()
+    size = fp.seek(0, io.SEEK_END)
+    fp.seek(position)
+    return size
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("date", pa.string()), ("team", pa.string())]), flavor="hive"
+)
+TIMESTAMP_TYPE = pa.timestamp("us", tz="UTC")
+
+
+def _utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def write_snapshot(gains_df, root="snapshots", taken_at=None):
+    """Append one run of long-form gains to the dataset under ``root``.
+
+    Files are partitioned by UTC date and team, so every run adds new
+    files and nothing already written is overwritten.
+    """
+    taken_at = _utc(taken_at or datetime.now(timezone.utc))
+    frame = gains_df.assign(
+        taken_at=pd.Timestamp(taken_at), date=taken_at.strftime("%Y-%m-%d")
+    )
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.set_column(
+        table.schema.get_field_index("taken_at"),
+        "taken_at",
+        table.column("taken_at").cast(TIMESTAMP_TYPE),
+    )
+    pq.write_to_dataset(
+        table,
+        root,
+        partitioning=PARTITIONING,
+        basename_template=f"{taken_at:%Y%m%dT%H%M%S%f}-{{i}}.parquet",
+    )
+    return taken_at
+
+
+def snapshot_scanner(root="snapshots", start=None, end=None, teams=None, columns=None):
+    """Lazily scan snapshots taken in ``[start, end)`` for the given teams.
+
+    Date and team filters prune whole partitions before any file is read,
+    and only ``columns`` are decoded.
+    """
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+
+    conditions = []
+    if start is not None:
+        start = _utc(start)
+        conditions.append(ds.field("date") >= start.strftime("%Y-%m-%d"))
+        conditions.append(ds.field("taken_at") >= pa.scalar(start, TIMESTAMP_TYPE))
+    if end is not None:
+        end = _utc(end)
+        conditions.append(ds.field("date") <= end.strftime("%Y-%m-%d"))
+        conditions.append(ds.field("taken_at") < pa.scalar(end, TIMESTAMP_TYPE))
+    if teams:
+        conditions.append(ds.field("team").isin(list(teams)))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    return dataset.scanner(columns=columns, filter=expression)
+
+
+def load_snapshots(root="snapshots", start=None, end=None, teams=None, columns=None):
+    return snapshot_scanner(root, start, end, teams, columns).to_table().to_pandas()
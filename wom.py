@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import time
+
+import aiohttp
+
+from rate_limit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+BASE_URL = "https://api.wiseoldman.net/v2"
+USER_AGENT = "sors-bingo-bot"
+
+
+class ResponseCache:
+    """SQLite store of ``/gained`` payloads keyed by (player, startDate, endDate)."""
+
+    def __init__(self, path="wom_cache.sqlite3"):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS gains (
+                player TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                body TEXT NOT NULL,
+                etag TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (player, start_date, end_date)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, player, start_date, end_date):
+        row = self.conn.execute(
+            """
+            SELECT body, etag, fetched_at FROM gains
+            WHERE player = ? AND start_date = ? AND end_date = ?
+            """,
+            (player.lower(), start_date, end_date),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def put(self, player, start_date, end_date, body, etag=None):
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO gains
+                (player, start_date, end_date, body, etag, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                player.lower(),
+                start_date,
+                end_date,
+                json.dumps(body),
+                etag,
+                time.time(),
+            ),
+        )
+        self.conn.commit()
+
+    def touch(self, player, start_date, end_date):
+        self.conn.execute(
+            """
+            UPDATE gains SET fetched_at = ?
+            WHERE player = ? AND start_date = ? AND end_date = ?
+            """,
+            (time.time(), player.lower(), start_date, end_date),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class WiseOldManClient:
+    def __init__(
+        self,
+        api_key=None,
+        rate=20,
+        per=60.0,
+        concurrency=5,
+        max_retries=4,
+        timeout=30,
+        session=None,
+        cache=None,
+        ttl=3600,
+        offline=False,
+    ):
+        self.api_key = api_key
+        self.bucket = TokenBucket(rate, per)
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = session
+        self._owns_session = session is None
+        self.cache = cache
+        self.ttl = ttl
+        self.offline = offline
+        self.stats = {
+            "fresh": 0,
+            "revalidated": 0,
+            "fetched": 0,
+            "offline": 0,
+            "rate_limited": 0,
+        }
+
+    async def __aenter__(self):
+        if self.session is None and not self.offline:
+            headers = {"User-Agent": USER_AGENT}
+            if self.api_key:
+                headers["x-api-key"] = self.api_key
+            self.session = aiohttp.ClientSession(
+                headers=headers,
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+            )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self.session is not None and self._owns_session:
+            await self.session.close()
+            self.session = None
+
+    def _backoff(self, attempt):
+        return min(60.0, 2**attempt) + random.uniform(0, 1)
+
+    async def get(self, path, params=None):
+        """GET a WOM endpoint, returning parsed JSON or None if not found."""
+        _, body, _ = await self.request(path, params)
+        return body
+
+    async def request(self, path, params=None, etag=None):
+        """GET a WOM endpoint, returning ``(status, body, etag)``.
+
+        ``status`` is 200, 304 (only when ``etag`` was sent) or 404.
+        """
+        url = BASE_URL + path
+        headers = {"If-None-Match": etag} if etag else None
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                async with self.semaphore:
+                    async with self.session.get(
+                        url, params=params, headers=headers
+                    ) as response:
+                        self.bucket.update_from_headers(response.headers)
+                        if response.status == 200:
+                            return (
+                                200,
+                                await response.json(),
+                                response.headers.get("ETag"),
+                            )
+                        if response.status in (304, 404):
+                            return response.status, None, etag
+                        if response.status == 429:
+                            self.stats["rate_limited"] += 1
+                            retry_after = response.headers.get(
+                                "Retry-After"
+                            ) or response.headers.get("RateLimit-Reset")
+                            delay = (
+                                float(retry_after)
+                                if retry_after
+                                else self._backoff(attempt)
+                            )
+                            self.bucket.block_for(delay)
+                        elif response.status < 500:
+                            response.raise_for_status()
+                        else:
+                            delay = self._backoff(attempt)
+                        log.warning(
+                            "WOM %s returned %s (attempt %s)",
+                            path,
+                            response.status,
+                            attempt + 1,
+                        )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = self._backoff(attempt)
+                log.warning("WOM %s failed: %s (attempt %s)", path, e, attempt + 1)
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+
+        raise RuntimeError(f"WOM request for {path} failed after retries")
+
+    async def player_gains(self, player, start_date, end_date):
+        cached = self.cache.get(player, start_date, end_date) if self.cache else None
+
+        if cached is not None:
+            body, etag, fetched_at = cached
+            if self.offline or time.time() - fetched_at < self.ttl:
+                self.stats["fresh"] += 1
+                return body
+        elif self.offline:
+            self.stats["offline"] += 1
+            return None
+
+        status, fresh_body, new_etag = await self.request(
+            f"/players/{player}/gained",
+            params={"startDate": start_date, "endDate": end_date},
+            etag=cached[1] if cached else None,
+        )
+        if status == 304:
+            self.stats["revalidated"] += 1
+            self.cache.touch(player, start_date, end_date)
+            return cached[0]
+
+        self.stats["fetched"] += 1
+        if status == 200 and self.cache:
+            self.cache.put(player, start_date, end_date, fresh_body, new_etag)
+        return fresh_body
+
+    async def gains_for_teams(self, teams, start_date, end_date):
+        """Fetch ``/gained`` for every player, keyed by ``(team, player)``.
+
+        Players that could not be fetched map to None.
+        """
+
+        async def fetch(team, player):
+            try:
+                return (team, player), await self.player_gains(
+                    player, start_date, end_date
+                )
+            except Exception as e:
+                log.warning("Failed to fetch gains for %s: %s", player, e)
+                return (team, player), None
+
+        results = await asyncio.gather(
+            *(
+                fetch(team, player)
+                for team, players in teams.items()
+                for player in players
+            )
+        )
+        return dict(results)